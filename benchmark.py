@@ -0,0 +1,533 @@
+import os
+import struct
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import contextlib
+import subprocess
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+DEFAULT_SCENARIOS = ['small=5x4x1', 'medium=5x2x16', 'large=2x1x128']
+DEFAULT_PLATFORMS = 'meta'
+UPLOAD_COSTS = {'youtube': 1600}
+
+class StandInState:
+    GRAPH_CHUNK = 8 * 1024 * 1024
+    
+    def __init__(self, latency=0.0, bandwidth_mbps=0.0, error_rate=0.0, throttle_rate=0.0, seed=None):
+        self.latency = latency
+        self.bandwidth = bandwidth_mbps * 1024 * 1024 / 8
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.next_free = 0.0
+        self.sessions = {}
+        self.session_counter = 0
+        self.counters = {'requests': 0, 'bytes_received': 0, 'errors_injected': 0, 'throttled': 0, 'completed': 0}
+    
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+    
+    def new_session(self, size):
+        with self.lock:
+            self.session_counter += 1
+            session_id = f"s{self.session_counter}"
+            self.sessions[session_id] = {'size': size, 'received': 0}
+        return session_id
+    
+    def pace(self, length):
+        if not self.bandwidth:
+            return
+        with self.lock:
+            now = time.time()
+            self.next_free = max(now, self.next_free) + length / self.bandwidth
+            delay = self.next_free - now
+        time.sleep(delay)
+    
+    def fault(self):
+        with self.lock:
+            roll = self.random.random()
+        if roll < self.throttle_rate:
+            return 429
+        if roll < self.throttle_rate + self.error_rate:
+            return 500
+        return None
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    
+    def log_message(self, format, *args):
+        pass
+    
+    @property
+    def state(self):
+        return self.server.state
+    
+    def read_body(self, throttled=True):
+        length = int(self.headers.get('Content-Length', 0))
+        chunks = []
+        remaining = length
+        while remaining > 0:
+            block = self.rfile.read(min(remaining, 64 * 1024))
+            if not block:
+                break
+            if throttled:
+                self.state.pace(len(block))
+            chunks.append(block)
+            remaining -= len(block)
+        body = b''.join(chunks)
+        self.state.count('bytes_received', len(body))
+        return body
+    
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_empty(self, status, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+    
+    def handle_request(self, method):
+        self.state.count('requests')
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        
+        fault = self.state.fault()
+        if fault is not None:
+            self.read_body(throttled=False)
+            if fault == 429:
+                self.state.count('throttled')
+                self.send_json(429, {'error': {'message': 'Application request limit reached', 'code': 4}},
+                               {'Retry-After': '1'})
+            else:
+                self.state.count('errors_injected')
+                self.send_json(500, {'error': {'message': 'Service temporarily unavailable', 'code': 2}})
+            return
+        
+        path = urllib.parse.urlsplit(self.path).path
+        if path.startswith('/graph/'):
+            self.handle_graph(method, path[len('/graph/'):].split('/'))
+        elif path.startswith('/tiktok/'):
+            self.handle_tiktok(method, path[len('/tiktok'):])
+        elif path.startswith('/youtube/'):
+            self.handle_youtube(method, path[len('/youtube'):])
+        else:
+            self.read_body(throttled=False)
+            self.send_json(404, {'error': {'message': f"Unknown path {path}"}})
+    
+    def do_GET(self):
+        self.handle_request('GET')
+    
+    def do_POST(self):
+        self.handle_request('POST')
+    
+    def do_PUT(self):
+        self.handle_request('PUT')
+    
+    def parse_form(self, body):
+        content_type = self.headers.get('Content-Type', '')
+        if content_type.startswith('application/x-www-form-urlencoded'):
+            return dict(urllib.parse.parse_qsl(body.decode())), {}
+        
+        fields, files = {}, {}
+        boundary = content_type.split('boundary=')[-1].encode()
+        for part in body.split(b'--' + boundary):
+            if b'\r\n\r\n' not in part:
+                continue
+            head, content = part.split(b'\r\n\r\n', 1)
+            content = content[:-2] if content.endswith(b'\r\n') else content
+            disposition = head.decode(errors='replace')
+            name = disposition.split('name="', 1)[1].split('"', 1)[0]
+            if 'filename="' in disposition:
+                files[name] = content
+            else:
+                fields[name] = content.decode()
+        return fields, files
+    
+    def handle_graph(self, method, parts):
+        if method == 'GET':
+            self.send_json(200, {'id': parts[-1], 'name': 'Stand-in Page'})
+            return
+        
+        fields, files = self.parse_form(self.read_body())
+        phase = fields.get('upload_phase')
+        
+        if 'batch' in fields:
+            self.state.count('status_checks')
+            results = []
+            for request in json.loads(fields['batch']):
+                video_id = request['relative_url'].split('?', 1)[0]
+                results.append({'code': 200, 'body': json.dumps({'id': video_id, 'status': {'video_status': 'ready'}})})
+            self.send_json(200, results)
+        elif phase == 'start':
+            size = int(fields['file_size'])
+            session_id = self.state.new_session(size)
+            self.send_json(200, {
+                'upload_session_id': session_id,
+                'video_id': f"v{session_id}",
+                'start_offset': '0',
+                'end_offset': str(min(size, self.state.GRAPH_CHUNK)),
+            })
+        elif phase == 'transfer':
+            session = self.state.sessions.get(fields.get('upload_session_id'))
+            if session is None:
+                self.send_json(400, {'error': {'message': 'Invalid upload session', 'code': 6000}})
+                return
+            if int(fields['start_offset']) != session['received']:
+                self.send_json(400, {'error': {
+                    'message': 'Invalid start offset',
+                    'code': 6001,
+                    'error_subcode': 1363037,
+                    'error_data': {
+                        'start_offset': str(session['received']),
+                        'end_offset': str(min(session['size'], session['received'] + self.state.GRAPH_CHUNK)),
+                    },
+                }})
+                return
+            session['received'] += len(files.get('video_file_chunk', b''))
+            end_offset = min(session['size'], session['received'] + self.state.GRAPH_CHUNK)
+            self.send_json(200, {'start_offset': str(session['received']), 'end_offset': str(end_offset)})
+        elif phase == 'finish':
+            self.state.count('completed')
+            self.send_json(200, {'success': True})
+        else:
+            self.send_json(400, {'error': {'message': 'Unsupported upload phase', 'code': 100}})
+    
+    def handle_tiktok(self, method, path):
+        if path == '/v2/post/publish/video/init/':
+            request = json.loads(self.read_body() or b'{}')
+            size = request.get('source_info', {}).get('video_size', 0)
+            session_id = self.state.new_session(size)
+            host = self.headers.get('Host')
+            self.send_json(200, {
+                'data': {'publish_id': session_id, 'upload_url': f"http://{host}/tiktok/upload/{session_id}"},
+                'error': {'code': 'ok', 'message': ''},
+            })
+        elif path.startswith('/upload/') and method == 'PUT':
+            session = self.state.sessions.get(path.rsplit('/', 1)[-1])
+            body = self.read_body()
+            if session is None:
+                self.send_json(404, {'error': {'code': 'not_found'}})
+                return
+            session['received'] += len(body)
+            self.send_empty(201 if session['received'] >= session['size'] else 206)
+        elif path == '/v2/post/publish/status/fetch/':
+            request = json.loads(self.read_body() or b'{}')
+            session = self.state.sessions.get(request.get('publish_id'))
+            if session is not None and session['received'] >= session['size']:
+                if not session.get('completed'):
+                    session['completed'] = True
+                    self.state.count('completed')
+                status = 'PUBLISH_COMPLETE'
+            else:
+                status = 'PROCESSING_UPLOAD'
+            self.send_json(200, {'data': {'status': status}, 'error': {'code': 'ok', 'message': ''}})
+        else:
+            self.read_body(throttled=False)
+            self.send_json(404, {'error': {'code': 'not_found'}})
+    
+    def handle_youtube(self, method, path):
+        if path == '/token':
+            self.read_body(throttled=False)
+            self.send_json(200, {'access_token': 'stand-in-token', 'expires_in': 3600, 'token_type': 'Bearer'})
+        elif path == '/upload/youtube/v3/videos' and method == 'POST':
+            self.read_body(throttled=False)
+            size = int(self.headers.get('X-Upload-Content-Length', 0))
+            session_id = self.state.new_session(size)
+            host = self.headers.get('Host')
+            self.send_empty(200, {'Location': f"http://{host}/youtube/upload/session/{session_id}"})
+        elif path.startswith('/upload/session/') and method == 'PUT':
+            session = self.state.sessions.get(path.rsplit('/', 1)[-1])
+            body = self.read_body()
+            if session is None:
+                self.send_json(404, {'error': {'code': 404, 'message': 'Upload session not found'}})
+                return
+            if body:
+                session['received'] += len(body)
+            if session['received'] >= session['size']:
+                if not session.get('completed'):
+                    session['completed'] = True
+                    self.state.count('completed')
+                self.send_json(200, {'id': f"yt{path.rsplit('/', 1)[-1]}", 'status': {'uploadStatus': 'uploaded'}})
+            elif session['received']:
+                self.send_empty(308, {'Range': f"bytes=0-{session['received'] - 1}"})
+            else:
+                self.send_empty(308)
+        else:
+            self.read_body(throttled=False)
+            self.send_json(404, {'error': {'code': 404, 'message': 'Not found'}})
+
+def start_stand_in(state):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.daemon_threads = True
+    server.state = state
+    thread = threading.Thread(target=server.serve_forever, daemon=True, name='stand-in')
+    thread.start()
+    return server
+
+def parse_scenario(text):
+    name, spec = text.split('=', 1)
+    folders, videos, size_mb = spec.lower().split('x')
+    return {'name': name, 'folders': int(folders), 'videos': int(videos), 'size_mb': float(size_mb)}
+
+def mp4_box(box_type, payload):
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+def mp4_header(duration=30, width=1080, height=1920):
+    mvhd = struct.pack('>B3xIIII', 0, 0, 0, 1000, duration * 1000) + bytes(80)
+    tkhd = struct.pack('>B3xIIII', 0, 0, 0, 1, 0) + bytes(52) + struct.pack('>II', width << 16, height << 16)
+    hdlr = struct.pack('>B3xI4s', 0, 0, b'vide') + bytes(13)
+    stsd = struct.pack('>B3xII4s', 0, 1, 16, b'avc1')
+    minf = mp4_box(b'minf', mp4_box(b'stbl', mp4_box(b'stsd', stsd)))
+    trak = mp4_box(b'trak', mp4_box(b'tkhd', tkhd) + mp4_box(b'mdia', mp4_box(b'hdlr', hdlr) + minf))
+    return mp4_box(b'ftyp', b'isom\x00\x00\x02\x00isomavc1') + mp4_box(b'moov', mp4_box(b'mvhd', mvhd) + trak)
+
+def generate_folders(root, scenario):
+    base_block = os.urandom(1024 * 1024)
+    movie_header = mp4_header()
+    folders = []
+    total_bytes = 0
+    
+    for folder_index in range(scenario['folders']):
+        folder = os.path.join(root, f"folder{folder_index + 1}")
+        os.makedirs(folder)
+        folders.append(folder)
+        
+        for video_index in range(scenario['videos']):
+            size = int(scenario['size_mb'] * 1024 * 1024)
+            path = os.path.join(folder, f'"Benchmark video {folder_index + 1}-{video_index + 1}" [bench].mp4')
+            header = movie_header + struct.pack('>I4s', size - len(movie_header), b'mdat') + os.urandom(64)
+            with open(path, 'wb') as f:
+                f.write(header)
+                written = len(header)
+                while written < size:
+                    block = base_block[:size - written]
+                    f.write(block)
+                    written += len(block)
+            total_bytes += size
+    
+    return folders, total_bytes
+
+def seed_history(path, count):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            f.write(json.dumps({
+                'video_path': f"/seed/folder{i % 50}/video{i}.mp4",
+                'platform': ('meta', 'tiktok', 'youtube')[i % 3],
+                'upload_date': '2024-01-01 00:00:00',
+                'status': 'success',
+            }) + '\n')
+
+def write_config(root, folders, server_url, args):
+    platforms = {}
+    for platform in args.platforms.split(','):
+        if platform == 'meta':
+            platforms['meta'] = {
+                'enabled': True,
+                'api_base': f"{server_url}/graph/v18.0",
+                'credentials': {
+                    'access_token': 'stand-in',
+                    'page_id': '1000',
+                    'page_ids': [str(1000 + page) for page in range(args.pages)],
+                },
+            }
+        elif platform == 'tiktok':
+            platforms['tiktok'] = {
+                'enabled': True,
+                'api_base': f"{server_url}/tiktok",
+                'credentials': {'access_token': 'stand-in'},
+            }
+        elif platform == 'youtube':
+            platforms['youtube'] = {
+                'enabled': True,
+                'api_base': f"{server_url}/youtube",
+                'token_url': f"{server_url}/youtube/token",
+                'credentials': {'client_id': 'stand-in', 'client_secret': 'stand-in', 'refresh_token': 'stand-in'},
+            }
+    
+    rate_limits = {}
+    for name in platforms:
+        rate = args.rate * UPLOAD_COSTS.get(name, 1)
+        rate_limits[name] = {'rate': rate, 'burst': max(rate, UPLOAD_COSTS.get(name, 1)), 'min_rate': rate, 'max_rate': rate}
+    
+    config = {
+        'folders': folders,
+        'platforms': platforms,
+        'testing_mode': False,
+        'concurrency': {
+            'enabled': args.concurrent,
+            'max_workers': args.workers,
+            'platform_limits': {name: args.workers for name in platforms},
+        },
+        'rate_limits': rate_limits,
+        'scanner': {'settle_seconds': 0},
+    }
+    with open(os.path.join(root, 'config.json'), 'w') as f:
+        json.dump(config, f, indent=2)
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+def run_scenario(scenario, args):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    
+    state = StandInState(args.latency, args.bandwidth, args.error_rate, args.throttle_rate, args.seed)
+    server = start_stand_in(state)
+    server_url = f"http://127.0.0.1:{server.server_address[1]}"
+    
+    with tempfile.TemporaryDirectory(prefix='uploader-bench-') as root:
+        folders, total_bytes = generate_folders(root, scenario)
+        write_config(root, folders, server_url, args)
+        os.chdir(root)
+        seed_history('upload_history.jsonl', args.history_size)
+        
+        import uploader
+        
+        load_started = time.perf_counter()
+        manager = uploader.VideoUploadManager()
+        history_load = time.perf_counter() - load_started
+        
+        history_time = [0.0]
+        tracker = manager.tracker
+        
+        def timed(method):
+            def wrapper(*a, **kw):
+                started = time.perf_counter()
+                try:
+                    return method(*a, **kw)
+                finally:
+                    history_time[0] += time.perf_counter() - started
+            return wrapper
+        
+        tracker.is_uploaded = timed(tracker.is_uploaded)
+        tracker.record_upload = timed(tracker.record_upload)
+        
+        uploads_before = len(tracker.history)
+        started = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for _ in range(scenario['videos']):
+                manager.upload_batch('benchmark')
+        elapsed = time.perf_counter() - started
+        uploads = len(tracker.history) - uploads_before
+        
+        for platform_uploader in manager.uploaders.values():
+            platform_uploader.close()
+        server.shutdown()
+    
+    expected = scenario['folders'] * scenario['videos'] * len(args.platforms.split(','))
+    return {
+        'scenario': scenario['name'],
+        'folders': scenario['folders'],
+        'videos_per_folder': scenario['videos'],
+        'video_mb': scenario['size_mb'],
+        'platforms': args.platforms,
+        'concurrent': args.concurrent,
+        'uploads': uploads,
+        'expected_uploads': expected,
+        'seconds': round(elapsed, 3),
+        'videos_per_hour': round(uploads / elapsed * 3600, 1) if elapsed else 0.0,
+        'mb_per_second': round(state.counters['bytes_received'] / (1024 * 1024) / elapsed, 2) if elapsed else 0.0,
+        'dataset_mb': round(total_bytes / (1024 * 1024), 1),
+        'peak_rss_mb': peak_rss_mb(),
+        'history_entries': args.history_size,
+        'history_load_seconds': round(history_load, 4),
+        'history_seconds': round(history_time[0], 4),
+        'history_overhead_pct': round(history_time[0] / elapsed * 100, 2) if elapsed else 0.0,
+        'server': dict(state.counters),
+    }
+
+def scenario_command(scenario_text, args):
+    command = [
+        sys.executable, os.path.abspath(__file__), '--run-scenario', scenario_text,
+        '--platforms', args.platforms,
+        '--latency', str(args.latency),
+        '--bandwidth', str(args.bandwidth),
+        '--error-rate', str(args.error_rate),
+        '--throttle-rate', str(args.throttle_rate),
+        '--history-size', str(args.history_size),
+        '--workers', str(args.workers),
+        '--pages', str(args.pages),
+        '--rate', str(args.rate),
+    ]
+    if args.seed is not None:
+        command += ['--seed', str(args.seed)]
+    if args.concurrent:
+        command.append('--concurrent')
+    return command
+
+def print_report(results):
+    print(f"{'scenario':<10} {'uploads':>9} {'seconds':>9} {'videos/h':>10} {'MB/s':>8} {'peak RSS':>10} {'history':>10}")
+    for result in results:
+        rss = f"{result['peak_rss_mb']:.1f}MB" if result['peak_rss_mb'] is not None else 'n/a'
+        print(f"{result['scenario']:<10} {result['uploads']:>4}/{result['expected_uploads']:<4} "
+              f"{result['seconds']:>9.2f} {result['videos_per_hour']:>10.1f} {result['mb_per_second']:>8.2f} "
+              f"{rss:>10} {result['history_overhead_pct']:>9.2f}%")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark upload batches against local platform stand-ins')
+    parser.add_argument('--scenario', action='append', help='NAME=FOLDERSxVIDEOSxSIZE_MB (repeatable)')
+    parser.add_argument('--platforms', default=DEFAULT_PLATFORMS, help='comma separated: meta,tiktok,youtube')
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds added to every stand-in response')
+    parser.add_argument('--bandwidth', type=float, default=0.0, help='shared upload cap in Mbit/s (0 = unlimited)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with HTTP 500')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='fraction of requests answered with HTTP 429')
+    parser.add_argument('--history-size', type=int, default=20000, help='synthetic history entries to preload')
+    parser.add_argument('--concurrent', action='store_true', help='enable the concurrent upload engine')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--pages', type=int, default=1, help='Facebook pages each video is posted to')
+    parser.add_argument('--rate', type=float, default=100.0, help='uploads per second allowed by each platform rate governor')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--run-scenario', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    
+    if args.run_scenario:
+        print(json.dumps(run_scenario(parse_scenario(args.run_scenario), args)))
+        return 0
+    
+    results = []
+    for scenario_text in args.scenario or DEFAULT_SCENARIOS:
+        completed = subprocess.run(scenario_command(scenario_text, args), capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"Scenario {scenario_text} failed:\n{completed.stderr}", file=sys.stderr)
+            return 1
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    
+    print_report(results)
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,17 +6,290 @@ import datetime
 import threading
 import signal
 import logging
-import pytz
-import requests
-import schedule
+import importlib
+import argparse
 import re
+import concurrent.futures
+import collections
+import ctypes
+import ctypes.util
+import select
+import struct
+import hashlib
+import mmap
+import random
+import itertools
+import heapq
+import queue
+import socket
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+class _LazyModule:
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+    
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+pytz = _LazyModule('pytz')
+requests = _LazyModule('requests')
+email_utils = _LazyModule('email.utils')
+urllib3_fields = _LazyModule('urllib3.fields')
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm')
+
+_output = threading.local()
+
+def emit(message=''):
+    buffer = getattr(_output, 'buffer', None)
+    if buffer is not None:
+        buffer.append(message)
+    else:
+        print(message)
+
+class _NullStage:
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        return False
+    
+    def set(self, outcome=None, bytes_sent=None):
+        pass
+
+_NULL_STAGE = _NullStage()
+
+class _Stage:
+    def __init__(self, metrics, name, platform):
+        self.metrics = metrics
+        self.name = name
+        self.platform = platform
+        self.outcome = 'ok'
+        self.bytes_sent = 0
+    
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.outcome = 'error'
+        self.metrics.observe(self.name, self.platform, time.perf_counter() - self.started, self.outcome, self.bytes_sent)
+        return False
+    
+    def set(self, outcome=None, bytes_sent=None):
+        if outcome is not None:
+            self.outcome = outcome
+        if bytes_sent is not None:
+            self.bytes_sent = bytes_sent
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.series = {}
+        self.prometheus_file = None
+        self.events_file = None
+        self.events = None
+    
+    def configure(self, settings):
+        with self.lock:
+            if self.events is not None:
+                self.events.close()
+                self.events = None
+            self.enabled = bool(settings.get('enabled'))
+            self.prometheus_file = settings.get('prometheus_file', 'upload_metrics.prom')
+            self.events_file = settings.get('events_file', 'upload_events.jsonl')
+    
+    def stage(self, name, platform=None):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, platform)
+    
+    def observe(self, name, platform, seconds, outcome, bytes_sent=0):
+        event = {
+            'time': time.time(),
+            'stage': name,
+            'platform': platform,
+            'outcome': outcome,
+            'seconds': round(seconds, 6),
+        }
+        if bytes_sent:
+            event['bytes'] = bytes_sent
+            event['bytes_per_second'] = round(bytes_sent / seconds, 1) if seconds > 0 else None
+        
+        with self.lock:
+            series = self.series.setdefault((name, platform or '', outcome), {'count': 0, 'seconds': 0.0, 'bytes': 0})
+            series['count'] += 1
+            series['seconds'] += seconds
+            series['bytes'] += bytes_sent
+            
+            if self.events_file:
+                if self.events is None:
+                    self.events = open(self.events_file, 'a', encoding='utf-8')
+                self.events.write(json.dumps(event) + '\n')
+                self.events.flush()
+    
+    def export(self):
+        if not self.enabled or not self.prometheus_file:
+            return
+        
+        with self.lock:
+            series = sorted(self.series.items())
+        
+        lines = [
+            '# HELP uploader_stage_seconds Time spent in each upload pipeline stage.',
+            '# TYPE uploader_stage_seconds summary',
+        ]
+        for (name, platform, outcome), values in series:
+            labels = f'stage="{name}",platform="{platform}",outcome="{outcome}"'
+            lines.append(f"uploader_stage_seconds_count{{{labels}}} {values['count']}")
+            lines.append(f"uploader_stage_seconds_sum{{{labels}}} {values['seconds']:.6f}")
+        
+        lines.append('# HELP uploader_bytes_sent_total Bytes transferred by successful uploads.')
+        lines.append('# TYPE uploader_bytes_sent_total counter')
+        for (name, platform, outcome), values in series:
+            if values['bytes']:
+                lines.append(f'uploader_bytes_sent_total{{stage="{name}",platform="{platform}"}} {values["bytes"]}')
+        
+        lines.append('# HELP uploader_throughput_bytes_per_second Mean throughput of successful uploads.')
+        lines.append('# TYPE uploader_throughput_bytes_per_second gauge')
+        for (name, platform, outcome), values in series:
+            if values['bytes'] and values['seconds'] > 0:
+                rate = values['bytes'] / values['seconds']
+                lines.append(f'uploader_throughput_bytes_per_second{{stage="{name}",platform="{platform}"}} {rate:.1f}')
+        
+        temp_file = self.prometheus_file + '.tmp'
+        with open(temp_file, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(temp_file, self.prometheus_file)
+
+METRICS = Metrics()
+
+class FileLock:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self.depth = 0
+        self.handle = None
+    
+    def __enter__(self):
+        self.lock.acquire()
+        if self.depth == 0:
+            try:
+                self.handle = open(self.path, 'a+b')
+                if fcntl is not None:
+                    fcntl.flock(self.handle.fileno(), fcntl.LOCK_EX)
+                else:
+                    self.handle.seek(0)
+                    msvcrt.locking(self.handle.fileno(), msvcrt.LK_LOCK, 1)
+            except Exception:
+                if self.handle is not None:
+                    self.handle.close()
+                    self.handle = None
+                self.lock.release()
+                raise
+        self.depth += 1
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.depth -= 1
+        if self.depth == 0:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(self.handle.fileno(), fcntl.LOCK_UN)
+                else:
+                    self.handle.seek(0)
+                    msvcrt.locking(self.handle.fileno(), msvcrt.LK_UNLCK, 1)
+            finally:
+                self.handle.close()
+                self.handle = None
+        self.lock.release()
+
+class ProcessLockError(Exception):
+    pass
+
+class ProcessLock:
+    def __init__(self, path):
+        self.path = path
+        self.handle = None
+    
+    def acquire(self):
+        handle = open(self.path, 'a+')
+        try:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            handle.close()
+            raise ProcessLockError(
+                f"Another uploader process{self._holder()} is using the job and session files guarded by {self.path}. "
+                f"Give each process its own workers.id to run several side by side"
+            )
+        
+        handle.seek(0)
+        handle.truncate()
+        handle.write(f"{os.getpid()}\n")
+        handle.flush()
+        self.handle = handle
+    
+    def _holder(self):
+        try:
+            with open(self.path, 'r') as f:
+                pid = f.read().strip()
+        except OSError:
+            return ""
+        return f" (pid {pid})" if pid else ""
+    
+    def release(self):
+        if self.handle is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.handle.fileno(), fcntl.LOCK_UN)
+            else:
+                self.handle.seek(0)
+                msvcrt.locking(self.handle.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self.handle.close()
+            self.handle = None
 
 class Config:
     def __init__(self):
         self.config_file = 'config.json'
         self.log_file = 'upload.log'
         self.history_file = 'upload_history.json'
+        self.history_journal = 'upload_history.jsonl'
+        self.transfer_state_file = 'upload_sessions.json'
+        self.fingerprint_cache_file = 'fingerprints.json'
+        self.scheduler_state_file = 'scheduler_state.json'
+        self.jobs_file = 'upload_jobs.jsonl'
+        self.stats_file = 'upload_stats.json'
+        self.lease_dir = 'leases'
+        self.process_lock_file = 'uploader.pid'
+        self.config_lock = FileLock(self.config_file + '.lock')
         self.load_config()
+        self._use_worker_files()
+    
+    def _use_worker_files(self):
+        worker_id = self.workers.get('id')
+        if not worker_id:
+            return
+        
+        for name in ('jobs_file', 'transfer_state_file', 'scheduler_state_file', 'fingerprint_cache_file', 'process_lock_file'):
+            base, ext = os.path.splitext(getattr(self, name))
+            setattr(self, name, f"{base}.{worker_id}{ext}")
+        self.lease_dir = self.workers.get('lease_dir', self.lease_dir)
     
     def load_config(self):
         if os.path.exists(self.config_file):
@@ -28,6 +301,19 @@ class Config:
                 self.timezone = config_data.get('timezone', 'UTC')
                 self.platforms = config_data.get('platforms', {})
                 self.testing_mode = config_data.get('testing_mode', False)
+                self.concurrency = config_data.get('concurrency', {})
+                self.http = config_data.get('http', {})
+                self.scanner = config_data.get('scanner', {})
+                self.fingerprinting = config_data.get('fingerprinting', {})
+                self.scheduler = config_data.get('scheduler', {})
+                self.metrics = config_data.get('metrics', {})
+                self.retry = config_data.get('retry', {})
+                self.rate_limits = config_data.get('rate_limits', {})
+                self.workers = config_data.get('workers', {})
+                self.selection = config_data.get('selection', {})
+                self.transfers = config_data.get('transfers', {})
+                self.planner = config_data.get('planner', {})
+                self.processing = config_data.get('processing', {})
                 
                 if 'facebook' in self.platforms or 'instagram' in self.platforms:
                     fb_config = self.platforms.get('facebook', {})
@@ -45,6 +331,19 @@ class Config:
             self.timezone = 'UTC'
             self.platforms = {}
             self.testing_mode = False
+            self.concurrency = {}
+            self.http = {}
+            self.scanner = {}
+            self.fingerprinting = {}
+            self.scheduler = {}
+            self.metrics = {}
+            self.retry = {}
+            self.rate_limits = {}
+            self.workers = {}
+            self.selection = {}
+            self.transfers = {}
+            self.planner = {}
+            self.processing = {}
     
     def save_config(self):
         config_data = {
@@ -53,10 +352,437 @@ class Config:
             'night_time': self.night_time,
             'timezone': self.timezone,
             'platforms': self.platforms,
-            'testing_mode': self.testing_mode
+            'testing_mode': self.testing_mode,
+            'concurrency': self.concurrency,
+            'http': self.http,
+            'scanner': self.scanner,
+            'fingerprinting': self.fingerprinting,
+            'scheduler': self.scheduler,
+            'metrics': self.metrics,
+            'retry': self.retry,
+            'rate_limits': self.rate_limits,
+            'workers': self.workers,
+            'selection': self.selection,
+            'transfers': self.transfers,
+            'planner': self.planner,
+            'processing': self.processing
+        }
+        with self.config_lock:
+            temp_file = self.config_file + '.tmp'
+            with open(temp_file, 'w') as f:
+                json.dump(config_data, f, indent=2)
+            os.replace(temp_file, self.config_file)
+
+PLATFORM_LIMITS = {
+    'meta': {'min_duration': 1, 'max_duration': 240 * 60, 'min_aspect': 9 / 16, 'max_aspect': 16 / 9},
+    'tiktok': {'min_duration': 3, 'max_duration': 600, 'min_short_side': 360,
+               'video_codecs': ['avc1', 'avc3', 'hvc1', 'hev1', 'vp08', 'vp09',
+                                'V_MPEG4/ISO/AVC', 'V_MPEGH/ISO/HEVC', 'V_VP8', 'V_VP9']},
+    'youtube': {'min_duration': 1, 'max_duration': 12 * 3600},
+}
+
+class ProbeError(Exception):
+    pass
+
+class ContainerProbe:
+    MAX_HEADER_BYTES = 64 * 1024 * 1024
+    MP4_CONTAINERS = (b'moov', b'trak', b'mdia', b'minf', b'stbl', b'mvex')
+    EBML_HEADER = 0x1A45DFA3
+    EBML_DOCTYPE = 0x4282
+    MKV_SEGMENT = 0x18538067
+    MKV_INFO = 0x1549A966
+    MKV_TIMECODE_SCALE = 0x2AD7B1
+    MKV_DURATION = 0x4489
+    MKV_TRACKS = 0x1654AE6B
+    MKV_TRACK_ENTRY = 0xAE
+    MKV_TRACK_TYPE = 0x83
+    MKV_CODEC_ID = 0x86
+    MKV_VIDEO = 0xE0
+    MKV_PIXEL_WIDTH = 0xB0
+    MKV_PIXEL_HEIGHT = 0xBA
+    MKV_CLUSTER = 0x1F43B675
+    
+    def __init__(self, path):
+        self.path = path
+    
+    def probe(self):
+        with open(self.path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            self.size = f.tell()
+            f.seek(0)
+            head = f.read(12)
+            
+            if len(head) < 12:
+                raise ProbeError("File too short to be a video")
+            if head[4:8] in (b'ftyp', b'moov', b'mdat', b'free', b'wide', b'skip'):
+                return self._probe_mp4(f)
+            if struct.unpack('>I', head[:4])[0] == self.EBML_HEADER:
+                return self._probe_ebml(f)
+            if head[:4] == b'RIFF' and head[8:12] == b'AVI ':
+                return {'container': 'avi'}
+            if head[:3] == b'FLV':
+                return {'container': 'flv'}
+            if head[:8] == b'\x30\x26\xb2\x75\x8e\x66\xcf\x11':
+                return {'container': 'asf'}
+            raise ProbeError("Unrecognised container")
+    
+    def _read(self, f, offset, length):
+        f.seek(offset)
+        data = f.read(length)
+        if len(data) < length:
+            raise ProbeError(f"File truncated at byte {offset + len(data)}")
+        return data
+    
+    def _probe_mp4(self, f):
+        offset = 0
+        moov = None
+        mdat_offset = None
+        
+        while offset < self.size:
+            if self.size - offset < 8:
+                raise ProbeError(f"File truncated inside box header at byte {offset}")
+            box_size, box_type = struct.unpack('>I4s', self._read(f, offset, 8))
+            header_size = 8
+            if box_size == 1:
+                box_size = struct.unpack('>Q', self._read(f, offset + 8, 8))[0]
+                header_size = 16
+            elif box_size == 0:
+                box_size = self.size - offset
+            
+            if box_size < header_size:
+                raise ProbeError(f"Corrupt {box_type.decode('latin-1')} box at byte {offset}")
+            if offset + box_size > self.size:
+                raise ProbeError(f"File truncated: {box_type.decode('latin-1')} box runs past end of file")
+            
+            if box_type == b'moov':
+                moov = (offset + header_size, box_size - header_size)
+            elif box_type == b'mdat' and mdat_offset is None:
+                mdat_offset = offset
+            offset += box_size
+        
+        if moov is None:
+            raise ProbeError("Missing moov box (incomplete or truncated recording)")
+        if moov[1] > self.MAX_HEADER_BYTES:
+            raise ProbeError("moov box too large")
+        
+        info = {
+            'container': 'mp4',
+            'moov_at_front': mdat_offset is None or moov[0] < mdat_offset,
+            'duration': None,
+            'width': None,
+            'height': None,
+            'video_codec': None,
+            'audio_codec': None,
+        }
+        timing = {}
+        self._parse_mp4_boxes(self._read(f, moov[0], moov[1]), info, {}, timing)
+        
+        duration = timing.get('duration') or timing.get('fragment_duration')
+        if timing.get('timescale') and duration:
+            info['duration'] = duration / timing['timescale']
+        
+        if info['video_codec'] is None:
+            raise ProbeError("No video track found")
+        return info
+    
+    def _mp4_boxes(self, data):
+        offset = 0
+        while offset + 8 <= len(data):
+            box_size, box_type = struct.unpack_from('>I4s', data, offset)
+            header_size = 8
+            if box_size == 1 and offset + 16 <= len(data):
+                box_size = struct.unpack_from('>Q', data, offset + 8)[0]
+                header_size = 16
+            elif box_size == 0:
+                box_size = len(data) - offset
+            if box_size < header_size or offset + box_size > len(data):
+                raise ProbeError(f"Corrupt {box_type.decode('latin-1')} box in movie header")
+            yield box_type, data[offset + header_size:offset + box_size]
+            offset += box_size
+    
+    def _parse_mp4_boxes(self, data, info, track, timing):
+        for box_type, payload in self._mp4_boxes(data):
+            if box_type == b'trak':
+                track = {}
+                self._parse_mp4_boxes(payload, info, track, timing)
+                self._finish_mp4_track(info, track)
+            elif box_type in self.MP4_CONTAINERS:
+                self._parse_mp4_boxes(payload, info, track, timing)
+            elif box_type == b'mvhd' and len(payload) >= 20:
+                if payload[0] == 1 and len(payload) >= 32:
+                    timing['timescale'], duration = struct.unpack_from('>IQ', payload, 20)
+                    unknown = 0xFFFFFFFFFFFFFFFF
+                else:
+                    timing['timescale'], duration = struct.unpack_from('>II', payload, 12)
+                    unknown = 0xFFFFFFFF
+                if duration != unknown:
+                    timing['duration'] = duration
+            elif box_type == b'mehd' and len(payload) >= 8:
+                if payload[0] == 1 and len(payload) >= 12:
+                    timing['fragment_duration'] = struct.unpack_from('>Q', payload, 4)[0]
+                else:
+                    timing['fragment_duration'] = struct.unpack_from('>I', payload, 4)[0]
+            elif box_type == b'tkhd' and len(payload) >= 44:
+                matrix_a, matrix_b = struct.unpack_from('>ii', payload, len(payload) - 44)
+                width, height = struct.unpack_from('>II', payload, len(payload) - 8)
+                track['width'] = width >> 16
+                track['height'] = height >> 16
+                track['rotated'] = matrix_a == 0 and abs(matrix_b) == 0x10000
+            elif box_type == b'hdlr' and len(payload) >= 12:
+                track['handler'] = payload[8:12]
+            elif box_type == b'stsd' and len(payload) >= 16:
+                track['codec'] = payload[12:16].decode('latin-1')
+    
+    def _finish_mp4_track(self, info, track):
+        if track.get('handler') == b'vide' and info['video_codec'] is None:
+            info['video_codec'] = track.get('codec')
+            width, height = track.get('width'), track.get('height')
+            if track.get('rotated'):
+                width, height = height, width
+            info['width'], info['height'] = width, height
+        elif track.get('handler') == b'soun' and info['audio_codec'] is None:
+            info['audio_codec'] = track.get('codec')
+    
+    def _read_vint(self, f, offset, keep_marker):
+        first = self._read(f, offset, 1)[0]
+        length = 1
+        mask = 0x80
+        while length <= 8 and not first & mask:
+            length += 1
+            mask >>= 1
+        if length > 8:
+            raise ProbeError(f"Invalid EBML length at byte {offset}")
+        
+        value = first if keep_marker else first & (mask - 1)
+        all_ones = (first & (mask - 1)) == mask - 1
+        for byte in self._read(f, offset + 1, length - 1):
+            value = (value << 8) | byte
+            all_ones = all_ones and byte == 0xFF
+        
+        if not keep_marker and all_ones:
+            value = None
+        return value, length
+    
+    def _ebml_element(self, f, offset):
+        element_id, id_length = self._read_vint(f, offset, True)
+        element_size, size_length = self._read_vint(f, offset + id_length, False)
+        return element_id, offset + id_length + size_length, element_size
+    
+    def _ebml_children(self, f, start, end):
+        offset = start
+        while offset < end:
+            element_id, data_offset, element_size = self._ebml_element(f, offset)
+            yield element_id, data_offset, element_size
+            if element_size is None:
+                return
+            offset = data_offset + element_size
+    
+    def _ebml_uint(self, f, offset, size):
+        return int.from_bytes(self._read(f, offset, size), 'big') if size else 0
+    
+    def _probe_ebml(self, f):
+        element_id, data_offset, header_size = self._ebml_element(f, 0)
+        info = {
+            'container': 'matroska',
+            'duration': None,
+            'width': None,
+            'height': None,
+            'video_codec': None,
+            'audio_codec': None,
         }
-        with open(self.config_file, 'w') as f:
-            json.dump(config_data, f, indent=2)
+        
+        for child_id, child_offset, child_size in self._ebml_children(f, data_offset, data_offset + header_size):
+            if child_id == self.EBML_DOCTYPE:
+                info['container'] = self._read(f, child_offset, child_size).decode('ascii', 'replace').strip('\x00')
+        
+        segment_id, segment_offset, segment_size = self._ebml_element(f, data_offset + header_size)
+        if segment_id != self.MKV_SEGMENT:
+            raise ProbeError("Missing Matroska segment")
+        if segment_size is not None and segment_offset + segment_size > self.size:
+            raise ProbeError("File truncated: segment runs past end of file")
+        segment_end = self.size if segment_size is None else segment_offset + segment_size
+        
+        timecode_scale = 1000000
+        duration = None
+        for child_id, child_offset, child_size in self._ebml_children(f, segment_offset, segment_end):
+            if child_id == self.MKV_CLUSTER or child_size is None:
+                break
+            if child_id == self.MKV_INFO:
+                for info_id, info_offset, info_size in self._ebml_children(f, child_offset, child_offset + child_size):
+                    if info_id == self.MKV_TIMECODE_SCALE:
+                        timecode_scale = self._ebml_uint(f, info_offset, info_size)
+                    elif info_id == self.MKV_DURATION:
+                        fmt = '>f' if info_size == 4 else '>d'
+                        duration = struct.unpack(fmt, self._read(f, info_offset, info_size))[0]
+            elif child_id == self.MKV_TRACKS:
+                for entry_id, entry_offset, entry_size in self._ebml_children(f, child_offset, child_offset + child_size):
+                    if entry_id == self.MKV_TRACK_ENTRY:
+                        self._parse_ebml_track(f, entry_offset, entry_offset + entry_size, info)
+        
+        if duration is not None:
+            info['duration'] = duration * timecode_scale / 1e9
+        if info['video_codec'] is None:
+            raise ProbeError("No video track found")
+        return info
+    
+    def _parse_ebml_track(self, f, start, end, info):
+        track = {}
+        for element_id, offset, size in self._ebml_children(f, start, end):
+            if element_id == self.MKV_TRACK_TYPE:
+                track['type'] = self._ebml_uint(f, offset, size)
+            elif element_id == self.MKV_CODEC_ID:
+                track['codec'] = self._read(f, offset, size).decode('ascii', 'replace').strip('\x00')
+            elif element_id == self.MKV_VIDEO:
+                for video_id, video_offset, video_size in self._ebml_children(f, offset, offset + size):
+                    if video_id == self.MKV_PIXEL_WIDTH:
+                        track['width'] = self._ebml_uint(f, video_offset, video_size)
+                    elif video_id == self.MKV_PIXEL_HEIGHT:
+                        track['height'] = self._ebml_uint(f, video_offset, video_size)
+        
+        if track.get('type') == 1 and info['video_codec'] is None:
+            info['video_codec'] = track.get('codec')
+            info['width'] = track.get('width')
+            info['height'] = track.get('height')
+        elif track.get('type') == 2 and info['audio_codec'] is None:
+            info['audio_codec'] = track.get('codec')
+
+class SharedReadBuffer:
+    BLOCK_SIZE = 1024 * 1024
+    DEFAULT_WINDOW_MB = 32
+    DEFAULT_MAX_LAG = 30
+    
+    def __init__(self, path, size, window_bytes=None, max_lag=None):
+        self.path = path
+        self.size = size
+        self.window_bytes = max(window_bytes or self.DEFAULT_WINDOW_MB * 1024 * 1024, 2 * self.BLOCK_SIZE)
+        self.max_lag = self.DEFAULT_MAX_LAG if max_lag is None else max_lag
+        self.cond = threading.Condition()
+        self.blocks = collections.deque()
+        self.window_start = 0
+        self.window_end = 0
+        self.positions = {}
+        self.detached = set()
+        self.thread = None
+        self.error = None
+        self.closed = False
+        self.shared_bytes = 0
+        self.disk_bytes = 0
+    
+    def read(self, consumer, offset, length):
+        length = max(0, min(length, self.size - offset))
+        
+        with self.cond:
+            if (not self.closed and consumer not in self.detached and offset >= self.window_start
+                    and length <= self.window_bytes - self.BLOCK_SIZE):
+                self.positions[consumer] = offset
+                self._evict()
+                self._start()
+                
+                while (self.window_end < offset + length and self.error is None and not self.closed
+                       and consumer in self.positions):
+                    self.cond.wait()
+                
+                if (self.window_end >= offset + length and offset >= self.window_start
+                        and consumer in self.positions):
+                    self.shared_bytes += length
+                    return self._slice(offset, length)
+            self.positions.pop(consumer, None)
+            self.disk_bytes += length
+        
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+    
+    def release(self, consumer):
+        with self.cond:
+            self.positions.pop(consumer, None)
+            self.cond.notify_all()
+    
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.blocks.clear()
+            self.positions = {}
+            self.cond.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+    
+    def _start(self):
+        if self.thread is None and self.window_end < self.size:
+            self.thread = threading.Thread(target=self._read_loop, daemon=True, name='shared-read')
+            self.thread.start()
+    
+    def _slice(self, offset, length):
+        index = (offset - self.window_start) // self.BLOCK_SIZE
+        skip = (offset - self.window_start) % self.BLOCK_SIZE
+        parts = []
+        remaining = length
+        while remaining > 0:
+            block = self.blocks[index]
+            part = block[skip:skip + remaining]
+            parts.append(part)
+            remaining -= len(part)
+            index += 1
+            skip = 0
+        return b''.join(parts)
+    
+    def _evict(self):
+        if not self.positions:
+            return
+        low = min(self.positions.values())
+        while self.blocks and self.window_start + len(self.blocks[0]) <= low:
+            self.window_start += len(self.blocks.popleft())
+    
+    def _detach_slowest(self):
+        consumer = min(self.positions, key=self.positions.get)
+        logging.warning(f"{consumer} fell behind the shared read window for {self.path}, reading from disk instead")
+        del self.positions[consumer]
+        self.detached.add(consumer)
+        self.cond.notify_all()
+    
+    def _read_loop(self):
+        try:
+            with open(self.path, 'rb') as f:
+                if hasattr(os, 'posix_fadvise'):
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                
+                offset = 0
+                while offset < self.size:
+                    with self.cond:
+                        full_since = None
+                        while not self.closed and self.window_end - self.window_start + self.BLOCK_SIZE > self.window_bytes:
+                            self._evict()
+                            if self.window_end - self.window_start + self.BLOCK_SIZE <= self.window_bytes:
+                                break
+                            if not self.positions:
+                                full_since = None
+                            elif full_since is None:
+                                full_since = time.time()
+                            elif time.time() - full_since > self.max_lag:
+                                self._detach_slowest()
+                                full_since = None
+                                continue
+                            self.cond.wait(1)
+                        if self.closed:
+                            return
+                    
+                    block = f.read(self.BLOCK_SIZE)
+                    if not block:
+                        raise OSError(f"{self.path} shrank while being read")
+                    
+                    with self.cond:
+                        if self.closed:
+                            return
+                        self.blocks.append(block)
+                        self.window_end += len(block)
+                        self.cond.notify_all()
+                    offset += len(block)
+        except Exception as e:
+            logging.error(f"Shared read of {self.path} failed: {e}")
+            with self.cond:
+                self.error = e
+                self.cond.notify_all()
 
 class VideoFile:
     def __init__(self, path):
@@ -64,6 +790,12 @@ class VideoFile:
         self.filename = os.path.basename(path)
         self.size = os.path.getsize(path)
         self.extension = os.path.splitext(path)[1].lower()
+        self.fingerprint = None
+        self.probe_result = None
+        self.shared = None
+        self.publish_at = None
+        self.remote_ids = {}
+        self.remote_pages = {}
         filename_without_ext = os.path.splitext(self.filename)[0]
         self.name = self._extract_description(filename_without_ext)
     
@@ -87,222 +819,3297 @@ class VideoFile:
         cleaned = re.sub(r'\s*[\[\(][^\]\)]*[\]\)]\s*', ' ', filename)
         return cleaned.strip()
     
-    def validate(self):
-        errors = []
+    def share(self, window_bytes=None, max_lag=None):
+        if self.shared is None:
+            self.shared = SharedReadBuffer(self.path, self.size, window_bytes, max_lag)
+        return self.shared
+    
+    def read(self, consumer, offset, length):
+        if self.shared is not None:
+            return self.shared.read(consumer, offset, length)
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+    
+    def release(self, consumer):
+        if self.shared is not None:
+            self.shared.release(consumer)
+    
+    def prefetch(self, length=None):
+        if not hasattr(os, 'posix_fadvise'):
+            return False
+        with open(self.path, 'rb') as f:
+            os.posix_fadvise(f.fileno(), 0, min(length or self.size, self.size), os.POSIX_FADV_WILLNEED)
+        return True
+    
+    def close(self):
+        if self.shared is not None:
+            self.shared.close()
+            if self.shared.shared_bytes:
+                logging.info(
+                    f"Shared read of {self.filename}: {self.shared.shared_bytes / (1024*1024):.1f}MB from buffer, "
+                    f"{self.shared.disk_bytes / (1024*1024):.1f}MB from disk"
+                )
+            self.shared = None
+    
+    def probe(self):
+        if self.probe_result is None:
+            try:
+                self.probe_result = ContainerProbe(self.path).probe()
+            except ProbeError as e:
+                self.probe_result = {'error': str(e)}
+            except OSError as e:
+                self.probe_result = {'error': f"Could not read file: {e}"}
+        return self.probe_result
+    
+    def validate(self, platform=None, limits=None):
+        with METRICS.stage('validate', platform) as stage:
+            errors = []
+            
+            if not os.path.exists(self.path):
+                errors.append(f"File does not exist: {self.path}")
+            
+            max_size = 4 * 1024 * 1024 * 1024
+            if self.size > max_size:
+                errors.append(f"File too large: {self.size / (1024*1024):.2f}MB (max 4GB)")
+            
+            if self.size == 0:
+                errors.append("File is empty")
+            
+            if self.extension not in VIDEO_EXTENSIONS:
+                errors.append(f"Invalid file format: {self.extension}")
+            
+            if not errors:
+                errors.extend(self._validate_container(platform, limits))
+            
+            stage.set(outcome='ok' if not errors else 'invalid')
+            return len(errors) == 0, errors
+    
+    def _validate_container(self, platform, limits):
+        info = self.probe()
+        if 'error' in info:
+            return [info['error']]
         
-        if not os.path.exists(self.path):
-            errors.append(f"File does not exist: {self.path}")
+        limits = dict(PLATFORM_LIMITS.get(platform, {}), **(limits or {}))
+        errors = []
+        duration = info.get('duration')
+        width, height = info.get('width'), info.get('height')
         
-        max_size = 4 * 1024 * 1024 * 1024
-        if self.size > max_size:
-            errors.append(f"File too large: {self.size / (1024*1024):.2f}MB (max 4GB)")
+        if duration is not None:
+            if 'min_duration' in limits and duration < limits['min_duration']:
+                errors.append(f"Video too short for {platform}: {duration:.1f}s (min {limits['min_duration']}s)")
+            if 'max_duration' in limits and duration > limits['max_duration']:
+                errors.append(f"Video too long for {platform}: {duration:.1f}s (max {limits['max_duration']}s)")
         
-        if self.size == 0:
-            errors.append("File is empty")
+        if width and height:
+            aspect = width / height
+            if 'min_aspect' in limits and aspect < limits['min_aspect'] - 0.01:
+                errors.append(f"Aspect ratio {width}x{height} too narrow for {platform}")
+            if 'max_aspect' in limits and aspect > limits['max_aspect'] + 0.01:
+                errors.append(f"Aspect ratio {width}x{height} too wide for {platform}")
+            if 'min_short_side' in limits and min(width, height) < limits['min_short_side']:
+                errors.append(f"Resolution {width}x{height} below {limits['min_short_side']}p for {platform}")
         
-        valid_extensions = ['.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm']
-        if self.extension not in valid_extensions:
-            errors.append(f"Invalid file format: {self.extension}")
+        codec = info.get('video_codec')
+        if codec and 'video_codecs' in limits and codec not in limits['video_codecs']:
+            errors.append(f"Video codec {codec} not supported by {platform}")
         
-        return len(errors) == 0, errors
+        return errors
 
-class PlatformUploader:
-    def __init__(self, credentials, testing_mode):
-        self.credentials = credentials
-        self.testing_mode = testing_mode
+ScanEntry = collections.namedtuple('ScanEntry', ['path', 'size', 'mtime', 'inode'])
+
+class InotifyWatcher:
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+                  IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+    EVENT_HEADER = struct.Struct('iIII')
     
-    def validate_credentials(self):
-        return True
+    def __init__(self):
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify is only available on Linux")
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}
     
-    def upload(self, video_file):
-        raise NotImplementedError()
+    def sync(self, folders):
+        for folder in set(self.watches.values()) - set(folders):
+            self.remove(folder)
+        
+        watched = set(self.watches.values())
+        for folder in folders:
+            if folder not in watched and os.path.isdir(folder):
+                wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), self.WATCH_MASK)
+                if wd < 0:
+                    logging.warning(f"Could not watch {folder}: {os.strerror(ctypes.get_errno())}")
+                    continue
+                self.watches[wd] = folder
+    
+    def remove(self, folder):
+        for wd, watched_folder in list(self.watches.items()):
+            if watched_folder == folder:
+                self.libc.inotify_rm_watch(self.fd, wd)
+                del self.watches[wd]
+    
+    def read_events(self, timeout):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        
+        data = os.read(self.fd, 64 * 1024)
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, name_length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size + name_length
+            
+            if mask & self.IN_Q_OVERFLOW:
+                return set(self.watches.values())
+            
+            folder = self.watches.get(wd)
+            if folder is None:
+                continue
+            changed.add(folder)
+            if mask & self.IN_IGNORED:
+                del self.watches[wd]
+        
+        return changed
+    
+    def close(self):
+        os.close(self.fd)
 
-class FacebookUploader(PlatformUploader):
-    def validate_credentials(self):
-        if not self.credentials.get('access_token'):
-            return False, "Missing access_token"
-        if not self.credentials.get('page_id'):
-            return False, "Missing page_id"
+class FolderScanner:
+    DEFAULT_POLL_INTERVAL = 30
+    DEFAULT_SETTLE_SECONDS = 10
+    
+    def __init__(self, config):
+        self.config = config
+        self.lock = threading.Lock()
+        self.index = {}
+        self.watched = set()
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.wakeup_event = threading.Event()
+    
+    def scan(self):
+        folder_videos = {}
         
-        try:
-            test_url = f"https://graph.facebook.com/v18.0/{self.credentials['page_id']}"
-            params = {'access_token': self.credentials['access_token'], 'fields': 'id,name'}
-            response = requests.get(test_url, params=params, timeout=10)
+        for folder in self.config.folders:
+            with self.lock:
+                cached = self.index.get(folder)
+                watched = folder in self.watched
             
-            if response.status_code == 200:
-                page_data = response.json()
-                page_name = page_data.get('name', 'Unknown')
-                logging.info(f"Facebook credentials valid. Connected to page: {page_name}")
-                return True, f"Connected to: {page_name}"
-            else:
-                error_data = response.json()
-                error_msg = error_data.get('error', {}).get('message', 'Unknown error')
-                logging.error(f"Facebook credential validation failed: {error_msg}")
-                return False, f"API Error: {error_msg}"
-        except Exception as e:
-            logging.error(f"Facebook credential validation error: {e}")
-            return False, f"Connection error: {str(e)}"
+            if cached is None or not watched:
+                cached = self.refresh(folder)
+            
+            if cached is not None:
+                folder_videos[folder] = list(cached['entries'])
+        
+        return folder_videos
     
-    def upload(self, video_file):
-        if self.testing_mode:
-            print("  [Testing Mode] Simulating upload...")
-            time.sleep(2)
-            return True
+    def entries(self, folder):
+        with self.lock:
+            cached = self.index.get(folder)
+        return dict(cached['entries']) if cached else {}
+    
+    def cached(self, folder):
+        with self.lock:
+            return self.index.get(folder)
+    
+    def refresh(self, folder, force=False):
+        try:
+            folder_mtime = os.stat(folder).st_mtime_ns
+        except OSError:
+            with self.lock:
+                self.index.pop(folder, None)
+            return None
         
-        is_valid, errors = video_file.validate()
-        if not is_valid:
-            raise Exception(f"Invalid video: {', '.join(errors)}")
+        with self.lock:
+            cached = self.index.get(folder)
+        if cached is not None and cached['mtime'] == folder_mtime and not force:
+            return self._restat(folder, cached)
         
-        cred_valid, cred_error = self.validate_credentials()
-        if not cred_valid:
-            raise Exception(f"Invalid credentials: {cred_error}")
+        entries = {}
+        with os.scandir(folder) as it:
+            for entry in it:
+                if os.path.splitext(entry.name)[1].lower() not in VIDEO_EXTENSIONS:
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries[entry.path] = ScanEntry(entry.path, stat.st_size, stat.st_mtime, stat.st_ino)
         
-        video_title = video_file.name
-        video_description = video_file.name
+        cached = {'mtime': folder_mtime, 'entries': entries}
+        with self.lock:
+            self.index[folder] = cached
+        return cached
+    
+    def _restat(self, folder, cached):
+        entries = {}
+        changed = False
+        for path, entry in cached['entries'].items():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                changed = True
+                continue
+            current = ScanEntry(path, stat.st_size, stat.st_mtime, stat.st_ino)
+            changed = changed or current != entry
+            entries[path] = current
         
-        url = f"https://graph.facebook.com/v18.0/{self.credentials['page_id']}/videos"
+        if not changed:
+            return cached
         
-        print(f"  Uploading {video_file.size / (1024*1024):.2f}MB...")
+        refreshed = {'mtime': cached['mtime'], 'entries': entries}
+        with self.lock:
+            if self.index.get(folder) is cached:
+                self.index[folder] = refreshed
+        return refreshed
+    
+    def settled(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        settle_seconds = self.config.scanner.get('settle_seconds', self.DEFAULT_SETTLE_SECONDS)
+        return stat.st_size > 0 and time.time() - stat.st_mtime >= settle_seconds
+    
+    def start_watching(self):
+        if self.thread is not None or not self.config.scanner.get('watch'):
+            return
         
-        with open(video_file.path, 'rb') as video:
-            files = {'source': video}
-            
-            data = {
-                'access_token': self.credentials['access_token'],
-                'title': video_title,
-                'description': video_description,
-            }
-            
-            if self.credentials.get('creative_folder_id'):
-                data['creative_folder_id'] = self.credentials['creative_folder_id']
-            
-            if self.credentials.get('crosspost_to_instagram', False):
-                data['crossposting_actions'] = json.dumps([{
-                    'page': self.credentials['page_id'],
-                    'should_upload_video_to_instagram': True
-                }])
-            
-            timeout = max(600, video_file.size / (1024 * 512))
-            response = requests.post(url, files=files, data=data, timeout=timeout)
-            
-            if response.status_code == 200:
-                result = response.json()
-                video_id = result.get('id')
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._watch_loop, daemon=True, name='folder-watcher')
+        self.thread.start()
+    
+    def stop_watching(self):
+        self.stop_event.set()
+        self.wakeup_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+            self.thread = None
+        with self.lock:
+            self.watched = set()
+    
+    def notify(self):
+        self.wakeup_event.set()
+    
+    def _watch_loop(self):
+        poll_interval = self.config.scanner.get('poll_interval', self.DEFAULT_POLL_INTERVAL)
+        inotify = None
+        if self.config.scanner.get('watch') != 'poll':
+            try:
+                inotify = InotifyWatcher()
+            except (OSError, AttributeError) as e:
+                logging.info(f"inotify unavailable, polling folders every {poll_interval}s: {e}")
+        
+        next_poll = 0
+        try:
+            while not self.stop_event.is_set():
+                folders = list(self.config.folders)
+                changed = set()
                 
-                if video_id:
-                    print(f"  Upload successful! Video ID: {video_id}")
-                    return True
+                if inotify is not None:
+                    inotify.sync(folders)
+                
+                if time.time() >= next_poll or self.wakeup_event.is_set():
+                    self.wakeup_event.clear()
+                    for folder in folders:
+                        self.refresh(folder)
+                    next_poll = time.time() + poll_interval
+                
+                with self.lock:
+                    self.watched = set(folder for folder in folders if folder in self.index)
+                
+                timeout = max(0, next_poll - time.time())
+                if inotify is not None:
+                    changed = inotify.read_events(min(timeout, 1.0))
                 else:
-                    raise Exception("Upload succeeded but no video ID returned")
-            else:
-                error_data = response.json()
-                error_msg = error_data.get('error', {}).get('message', 'Unknown error')
-                raise Exception(f"Upload failed: {error_msg}")
+                    self.wakeup_event.wait(timeout)
+                
+                for folder in changed:
+                    self.refresh(folder, force=True)
+        except Exception as e:
+            logging.error(f"Folder watcher stopped: {e}")
+        finally:
+            if inotify is not None:
+                inotify.close()
+            with self.lock:
+                self.watched = set()
 
-class TikTokUploader(PlatformUploader):
-    def validate_credentials(self):
-        if not self.credentials.get('access_token'):
-            return False, "Missing access_token"
-        return True, "OK"
+class TransferStateStore:
+    def __init__(self, state_file):
+        self.state_file = state_file
+        self.lock = threading.Lock()
+        self.sessions = {}
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r') as f:
+                    self.sessions = json.load(f)
+            except Exception as e:
+                logging.warning(f"Ignoring unreadable transfer state {self.state_file}: {e}")
     
-    def upload(self, video_file):
-        if self.testing_mode:
-            print("  [Testing Mode] Simulating TikTok upload...")
-            time.sleep(2)
-            return True
-        
-        is_valid, errors = video_file.validate()
-        if not is_valid:
-            raise Exception(f"Invalid video: {', '.join(errors)}")
-        
-        cred_valid, cred_error = self.validate_credentials()
-        if not cred_valid:
-            raise Exception(f"Invalid credentials: {cred_error}")
+    def _key(self, platform, video_file):
+        return f"{platform}:{os.path.abspath(video_file.path)}"
+    
+    def _fingerprint(self, video_file):
+        stat = os.stat(video_file.path)
+        return {'size': stat.st_size, 'mtime': stat.st_mtime}
+    
+    def load(self, platform, video_file):
+        with self.lock:
+            state = self.sessions.get(self._key(platform, video_file))
+        if not state:
+            return None
         
-        raise Exception("TikTok upload requires API implementation")
+        fingerprint = self._fingerprint(video_file)
+        if state.get('size') != fingerprint['size'] or state.get('mtime') != fingerprint['mtime']:
+            self.discard(platform, video_file)
+            return None
+        return dict(state)
+    
+    def save(self, platform, video_file, state):
+        state = dict(state)
+        state.update(self._fingerprint(video_file))
+        with self.lock:
+            self.sessions[self._key(platform, video_file)] = state
+            self._write()
+    
+    def discard(self, platform, video_file):
+        with self.lock:
+            if self.sessions.pop(self._key(platform, video_file), None) is not None:
+                self._write()
+    
+    def _write(self):
+        temp_file = self.state_file + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump(self.sessions, f, indent=2)
+        os.replace(temp_file, self.state_file)
 
-class YouTubeUploader(PlatformUploader):
-    def validate_credentials(self):
-        if not self.credentials.get('client_id'):
-            return False, "Missing client_id"
-        if not self.credentials.get('client_secret'):
-            return False, "Missing client_secret"
-        if not self.credentials.get('refresh_token'):
-            return False, "Missing refresh_token"
+class AuthError(Exception):
+    pass
+
+class PermanentUploadError(Exception):
+    pass
+
+class TransientUploadError(Exception):
+    pass
+
+def is_transient_error(error):
+    return not isinstance(error, PermanentUploadError)
+
+class CredentialManager:
+    VALIDATION_TTL = 3600
+    REFRESH_MARGIN = 300
+    RETRY_DELAY = 60
+    
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.entries = {}
+        self.fetch_locks = {}
+        self.generations = collections.Counter()
+        self.epoch = 0
+        self.wakeup = threading.Event()
+        self.stopped = False
+        self.thread = None
+    
+    def _fetch_lock(self, platform, kind):
+        with self.lock:
+            return self.fetch_locks.setdefault((platform, kind), threading.Lock())
+    
+    def validate(self, platform, uploader):
+        with self._fetch_lock(platform, 'validation'):
+            with self.lock:
+                entry = self._cached(platform, 'validation')
+                if entry:
+                    return True, entry['value']
+                generation = self._generation(platform)
+            
+            is_valid, message = uploader.validate_credentials()
+            if is_valid:
+                with self.lock:
+                    if self._generation(platform) == generation:
+                        self._store(platform, 'validation', uploader, message, time.time() + self.VALIDATION_TTL)
+            return is_valid, message
+    
+    def get_token(self, platform, uploader):
+        with self._fetch_lock(platform, 'token'):
+            with self.lock:
+                entry = self._cached(platform, 'token')
+                if entry:
+                    return entry['value']
+                generation = self._generation(platform)
+            
+            token, expires_in = uploader.fetch_access_token()
+            expires_at = time.time() + expires_in if expires_in else None
+            with self.lock:
+                if self._generation(platform) == generation:
+                    self._store(platform, 'token', uploader, token, expires_at)
+            return token
+    
+    def refresh(self, platform, uploader):
+        self._drop(platform)
+        is_valid, message = self.validate(platform, uploader)
+        if is_valid:
+            self.get_token(platform, uploader)
+        return is_valid, message
+    
+    def _drop(self, platform):
+        with self.lock:
+            self.entries.pop((platform, 'validation'), None)
+            self.entries.pop((platform, 'token'), None)
+            self.generations[platform] += 1
+    
+    def invalidate(self, platform):
+        self._drop(platform)
+        logging.info(f"Cached credentials for {platform} invalidated")
+    
+    def _generation(self, platform):
+        return self.epoch, self.generations[platform]
+    
+    def reset(self):
+        with self.lock:
+            self.entries = {}
+            self.epoch += 1
+    
+    def stop(self):
+        with self.lock:
+            self.stopped = True
+            self.entries = {}
+        self.wakeup.set()
+    
+    def _cached(self, platform, kind):
+        entry = self.entries.get((platform, kind))
+        if entry and (entry['expires_at'] is None or entry['expires_at'] > time.time()):
+            return entry
+        return None
+    
+    def _store(self, platform, kind, uploader, value, expires_at):
+        refresh_at = None
+        if expires_at is not None:
+            lifetime = expires_at - time.time()
+            refresh_at = expires_at - min(self.REFRESH_MARGIN, lifetime / 2)
+        
+        self.entries[(platform, kind)] = {
+            'uploader': uploader,
+            'value': value,
+            'expires_at': expires_at,
+            'refresh_at': refresh_at,
+        }
+        
+        if self.thread is None and not self.stopped:
+            self.thread = threading.Thread(target=self._refresh_loop, daemon=True, name='credential-refresh')
+            self.thread.start()
+        self.wakeup.set()
+    
+    def _refresh_loop(self):
+        while True:
+            with self.lock:
+                if self.stopped:
+                    return
+                now = time.time()
+                due = [(key, entry) for key, entry in self.entries.items()
+                       if entry['refresh_at'] is not None and entry['refresh_at'] <= now]
+                upcoming = [entry['refresh_at'] for entry in self.entries.values()
+                            if entry['refresh_at'] is not None and entry['refresh_at'] > now]
+            
+            for key, entry in due:
+                self._refresh(key, entry)
+            
+            if not due:
+                timeout = min(upcoming) - time.time() if upcoming else None
+                self.wakeup.wait(timeout)
+                self.wakeup.clear()
+    
+    def _refresh(self, key, entry):
+        platform, kind = key
+        uploader = entry['uploader']
+        
+        try:
+            if kind == 'token':
+                token, expires_in = uploader.fetch_access_token()
+                expires_at = time.time() + expires_in if expires_in else None
+                value = token
+            else:
+                is_valid, value = uploader.validate_credentials()
+                if not is_valid:
+                    raise AuthError(value)
+                expires_at = time.time() + self.VALIDATION_TTL
+        except Exception as e:
+            logging.warning(f"Background {kind} refresh for {platform} failed: {e}")
+            with self.lock:
+                if self.entries.get(key) is entry:
+                    if isinstance(e, AuthError) or entry['expires_at'] <= time.time():
+                        del self.entries[key]
+                    else:
+                        entry['refresh_at'] = min(entry['expires_at'], time.time() + self.RETRY_DELAY)
+            return
+        
+        with self.lock:
+            if self.entries.get(key) is entry:
+                self._store(platform, kind, uploader, value, expires_at)
+        logging.info(f"Refreshed {kind} for {platform}")
+
+class RateLimitedError(TransientUploadError):
+    def __init__(self, message, wait):
+        super().__init__(message)
+        self.wait = wait
+
+class RateGovernor:
+    DEFAULTS = {
+        'meta': {'rate': 0.2, 'burst': 3, 'min_rate': 1 / 120, 'max_rate': 2.0},
+        'tiktok': {'rate': 0.1, 'burst': 1, 'min_rate': 1 / 300, 'max_rate': 0.1},
+        'youtube': {'rate': 10000 / 86400, 'burst': 10000, 'min_rate': 10000 / 86400, 'max_rate': 10000 / 86400},
+    }
+    DEFAULT_BACKOFF = 60
+    DEFAULT_MAX_WAIT = 60
+    HIGH_USAGE = 75
+    CRITICAL_USAGE = 90
+    LOW_USAGE = 50
+    
+    def __init__(self, platform, settings=None, stopping=None):
+        self.platform = platform
+        self.stopping = stopping
+        self.capacity = 0
+        self.tokens = None
+        self.updated = time.monotonic()
+        self.blocked_until = 0
+        self.condition = threading.Condition()
+        self.configure(settings)
+    
+    def configure(self, settings=None):
+        defaults = self.DEFAULTS.get(self.platform, self.DEFAULTS['meta'])
+        settings = dict(defaults, **(settings or {}))
+        with self.condition:
+            self._refill(time.monotonic())
+            self.capacity = settings['burst']
+            self.min_rate = settings['min_rate']
+            self.max_rate = settings['max_rate']
+            self.max_wait = settings.get('max_wait', self.DEFAULT_MAX_WAIT)
+            self.rate = min(self.max_rate, max(self.min_rate, settings['rate']))
+            self.tokens = self.capacity if self.tokens is None else min(self.tokens, self.capacity)
+            self.condition.notify_all()
+    
+    def _refill(self, now):
+        if self.tokens is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def _wait(self, now, cost):
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= cost:
+            return 0
+        return (cost - self.tokens) / self.rate
+    
+    def _stopped(self):
+        return self.stopping is not None and self.stopping.is_set()
+    
+    def wait_time(self, cost=1):
+        with self.condition:
+            now = time.monotonic()
+            self._refill(now)
+            return self._wait(now, cost)
+    
+    def acquire(self, cost=1, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._wait(now, cost)
+                if wait <= 0:
+                    self.tokens -= cost
+                    return True
+                if self._stopped() or (deadline is not None and now + wait > deadline):
+                    return False
+                self.condition.wait(wait)
+    
+    def pause(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                if now >= self.blocked_until:
+                    return True
+                if self._stopped() or (deadline is not None and self.blocked_until > deadline):
+                    return False
+                self.condition.wait(self.blocked_until - now)
+    
+    def wake(self):
+        with self.condition:
+            self.condition.notify_all()
+    
+    def paused(self):
+        with self.condition:
+            return time.monotonic() < self.blocked_until
+    
+    def block(self, seconds, reason):
+        with self.condition:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.condition.notify_all()
+        logging.warning(f"{self.platform} requests paused for {seconds:.0f}s: {reason}")
+    
+    def observe(self, response):
+        if response.status_code in (429, 503):
+            retry_after = self._retry_after(response.headers.get('Retry-After'))
+            if response.status_code == 429 or retry_after is not None:
+                self._adjust(self.min_rate if response.status_code == 429 else self.rate / 2)
+                self.block(retry_after if retry_after is not None else self.DEFAULT_BACKOFF, f"HTTP {response.status_code}")
+        
+        if response.status_code == 403 and b'quotaExceeded' in (response.content or b''):
+            self._exhaust_daily_quota()
+        
+        usage, regain_minutes = self._usage(response.headers)
+        if usage is None:
+            return
+        
+        if usage >= self.CRITICAL_USAGE:
+            self._adjust(self.min_rate)
+            self.block(max(regain_minutes * 60, self.DEFAULT_BACKOFF), f"API usage at {usage:.0f}%")
+        elif usage >= self.HIGH_USAGE:
+            self._adjust(self.rate / 2)
+        elif usage < self.LOW_USAGE:
+            self._adjust(self.rate * 1.1)
+    
+    def _adjust(self, rate):
+        with self.condition:
+            now = time.monotonic()
+            self._refill(now)
+            rate = min(self.max_rate, max(self.min_rate, rate))
+            if rate != self.rate:
+                logging.info(f"{self.platform} request rate {self.rate:.4f}/s -> {rate:.4f}/s")
+            self.rate = rate
+            self.condition.notify_all()
+    
+    def _exhaust_daily_quota(self):
+        pacific = pytz.timezone('America/Los_Angeles')
+        now = datetime.datetime.now(pacific)
+        reset = pacific.localize(datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time()))
+        with self.condition:
+            self.tokens = 0
+        self.block((reset - now).total_seconds(), "daily quota exceeded")
+    
+    def _retry_after(self, value):
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = email_utils.parsedate_to_datetime(value)
+            return max(0.0, (retry_at - datetime.datetime.now(retry_at.tzinfo)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+    
+    def _usage(self, headers):
+        usage = None
+        regain_minutes = 0
+        
+        app_usage = headers.get('X-App-Usage')
+        if app_usage:
+            try:
+                values = json.loads(app_usage)
+                usage = max(float(values.get(key, 0)) for key in ('call_count', 'total_cputime', 'total_time'))
+            except (ValueError, TypeError, AttributeError):
+                pass
+        
+        business_usage = headers.get('X-Business-Use-Case-Usage')
+        if business_usage:
+            try:
+                for entries in json.loads(business_usage).values():
+                    for entry in entries:
+                        entry_usage = max(float(entry.get(key, 0)) for key in ('call_count', 'total_cputime', 'total_time'))
+                        usage = max(usage or 0, entry_usage)
+                        regain_minutes = max(regain_minutes, float(entry.get('estimated_time_to_regain_access', 0)))
+            except (ValueError, TypeError, AttributeError):
+                pass
+        
+        return usage, regain_minutes
+
+class StalledTransferError(TransientUploadError):
+    pass
+
+class BandwidthEstimator:
+    DEFAULT_INITIAL_MBPS = 4.0
+    DEFAULT_ALPHA = 0.3
+    DEFAULT_DEADLINE_FACTOR = 4.0
+    DEFAULT_MIN_DEADLINE = 60
+    DEFAULT_MAX_DEADLINE = 6 * 3600
+    MIN_SAMPLE_BYTES = 256 * 1024
+    
+    def __init__(self, platform, settings=None):
+        self.platform = platform
+        self.samples = 0
+        self.lock = threading.Lock()
+        self.configure(settings)
+    
+    def configure(self, settings=None):
+        settings = settings or {}
+        with self.lock:
+            self.alpha = settings.get('alpha', self.DEFAULT_ALPHA)
+            self.deadline_factor = settings.get('deadline_factor', self.DEFAULT_DEADLINE_FACTOR)
+            self.min_deadline = settings.get('min_deadline', self.DEFAULT_MIN_DEADLINE)
+            self.max_deadline = settings.get('max_deadline', self.DEFAULT_MAX_DEADLINE)
+            if self.samples == 0:
+                self.rate = settings.get('initial_mbps', self.DEFAULT_INITIAL_MBPS) * 1e6 / 8
+    
+    def observe(self, nbytes, seconds):
+        if nbytes < self.MIN_SAMPLE_BYTES or seconds <= 0:
+            return
+        with self.lock:
+            sample = nbytes / seconds
+            if self.samples == 0:
+                self.rate = sample
+            else:
+                self.rate = self.alpha * sample + (1 - self.alpha) * self.rate
+            self.samples += 1
+    
+    def estimate(self):
+        with self.lock:
+            return self.rate
+    
+    def deadline(self, nbytes):
+        expected = nbytes / max(self.estimate(), 1.0)
+        return min(self.max_deadline, max(self.min_deadline, expected * self.deadline_factor))
+
+class TransferProgress:
+    DEFAULT_STALL_WINDOW = 60
+    DEFAULT_MIN_KBPS = 16
+    DEFAULT_PROGRESS_STEP = 10
+    DEFAULT_PROGRESS_INTERVAL = 300
+    
+    def __init__(self, platform, video_file, total, offset=0, callback=None, deadline=None, settings=None):
+        settings = settings or {}
+        self.platform = platform
+        self.video_file = video_file
+        self.total = total
+        self.sent = offset
+        self.callback = callback
+        self.stall_window = settings.get('stall_window', self.DEFAULT_STALL_WINDOW)
+        self.min_rate = settings.get('min_throughput_kbps', self.DEFAULT_MIN_KBPS) * 1000 / 8
+        self.progress_step = max(1, settings.get('progress_step', self.DEFAULT_PROGRESS_STEP))
+        self.progress_interval = settings.get('progress_interval', self.DEFAULT_PROGRESS_INTERVAL)
+        self.deadline = deadline
+        self.started = time.time()
+        self.samples = collections.deque([(self.started, offset)])
+        self.last_report = self.started
+        self.last_step = self._step()
+    
+    def start(self, offset, deadline=None):
+        self.sent = offset
+        self.started = time.time()
+        self.samples = collections.deque([(self.started, self.sent)])
+        self.deadline = deadline
+        self.last_step = self._step()
+    
+    def _step(self):
+        return int(self.fraction() * 100 // self.progress_step)
+    
+    def advance(self, nbytes):
+        now = time.time()
+        self.sent += nbytes
+        self.samples.append((now, self.sent))
+        while len(self.samples) > 2 and self.samples[1][0] <= now - self.stall_window:
+            self.samples.popleft()
+        
+        step = self._step()
+        due = self.progress_interval and now - self.last_report >= self.progress_interval
+        if self.callback is not None and (step > self.last_step or due):
+            self.last_step = max(step, self.last_step)
+            self.last_report = now
+            try:
+                self.callback(self)
+            except Exception as e:
+                logging.warning(f"Progress callback failed: {e}")
+        self.check(now)
+    
+    def rate(self):
+        (first_time, first_sent), (last_time, last_sent) = self.samples[0], self.samples[-1]
+        elapsed = last_time - first_time
+        return (last_sent - first_sent) / elapsed if elapsed > 0 else None
+    
+    def check(self, now=None):
+        now = now or time.time()
+        if self.deadline is not None and now - self.started > self.deadline:
+            raise StalledTransferError(
+                f"{self.platform} transfer exceeded its {self.deadline:.0f}s deadline at {self.sent} of {self.total} bytes"
+            )
+        
+        first_time, first_sent = self.samples[0]
+        if now - first_time >= self.stall_window and now - self.started >= self.stall_window:
+            rate = (self.sent - first_sent) / (now - first_time)
+            if rate < self.min_rate:
+                raise StalledTransferError(
+                    f"{self.platform} transfer stalled at {self.sent} of {self.total} bytes "
+                    f"({rate / 1000:.1f}KB/s over {self.stall_window}s)"
+                )
+    
+    def fraction(self):
+        return self.sent / self.total if self.total else 1.0
+
+class ProgressReader:
+    BLOCK_SIZE = 64 * 1024
+    
+    def __init__(self, parts, progress=None, tracked_part=0):
+        self.parts = [memoryview(part) for part in parts]
+        self.length = sum(len(part) for part in self.parts)
+        self.progress = progress
+        self.tracked_part = tracked_part
+        self.index = 0
+        self.offset = 0
+    
+    def __len__(self):
+        return self.length
+    
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.length
+        size = min(size, self.BLOCK_SIZE)
+        
+        while self.index < len(self.parts) and self.offset >= len(self.parts[self.index]):
+            self.index += 1
+            self.offset = 0
+        if self.index >= len(self.parts):
+            return b''
+        
+        part = self.parts[self.index]
+        data = bytes(part[self.offset:self.offset + size])
+        self.offset += len(data)
+        if self.progress is not None and self.index == self.tracked_part:
+            self.progress.advance(len(data))
+        return data
+
+def _header_param(name, value):
+    formatter = getattr(urllib3_fields, 'format_multipart_header_param', None) or urllib3_fields.format_header_param_html5
+    return formatter(name, value)
+
+def multipart_body(fields, file_field, filename, content, progress=None):
+    boundary = os.urandom(16).hex()
+    head = []
+    for name, value in fields.items():
+        head.append(f'--{boundary}\r\nContent-Disposition: form-data; {_header_param("name", name)}\r\n\r\n{value}\r\n')
+    head.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; {_header_param("name", file_field)}; '
+        f'{_header_param("filename", filename)}\r\n'
+        f'Content-Type: application/octet-stream\r\n\r\n'
+    )
+    parts = [''.join(head).encode('utf-8'), content, f'\r\n--{boundary}--\r\n'.encode('utf-8')]
+    return ProgressReader(parts, progress, tracked_part=1), f'multipart/form-data; boundary={boundary}'
+
+class ChunkPrefetcher:
+    DEFAULT_DEPTH = 2
+    
+    def __init__(self, video_file, chunks, consumer, depth=DEFAULT_DEPTH):
+        self.video_file = video_file
+        self.chunks = list(chunks)
+        self.consumer = consumer
+        self.slots = threading.Semaphore(depth)
+        self.ready = queue.Queue()
+        self.stopped = threading.Event()
+        self.wait_seconds = 0.0
+        self.thread = threading.Thread(target=self._read_loop, daemon=True, name=f"prefetch-{consumer}")
+        self.thread.start()
+    
+    def _read_loop(self):
+        try:
+            for offset, length in self.chunks:
+                self.slots.acquire()
+                if self.stopped.is_set():
+                    return
+                self.ready.put((offset, self.video_file.read(self.consumer, offset, length)))
+        except Exception as e:
+            self.ready.put((None, e))
+    
+    def get(self):
+        started = time.time()
+        offset, chunk = self.ready.get()
+        self.wait_seconds += time.time() - started
+        if offset is None:
+            raise chunk
+        return offset, chunk
+    
+    def done(self):
+        self.slots.release()
+    
+    def close(self):
+        self.stopped.set()
+        self.slots.release()
+        self.thread.join()
+
+class GovernedAdapter:
+    def __init__(self, governor, adapter):
+        self.governor = governor
+        self.adapter = adapter
+    
+    def send(self, request, **kwargs):
+        if not self.governor.pause(self.governor.max_wait):
+            wait = self.governor.wait_time(0)
+            raise RateLimitedError(f"{self.governor.platform} requests paused for {wait:.0f}s", wait)
+        response = self.adapter.send(request, **kwargs)
+        self.governor.observe(response)
+        return response
+    
+    def close(self):
+        self.adapter.close()
+
+class PlatformUploader:
+    DEFAULT_CHUNK_SIZE_MB = 8
+    UPLOAD_COST = 1
+    MIN_SCHEDULE_LEAD = None
+    
+    PLATFORM = None
+    API_BASE = None
+    
+    def __init__(self, credentials, testing_mode, options=None, transfer_state=None, credential_manager=None,
+                 http_options=None, governor=None, bandwidth=None, transfer_options=None):
+        self.credentials = credentials
+        self.testing_mode = testing_mode
+        self.options = options or {}
+        self.transfer_state = transfer_state
+        self.credential_manager = credential_manager
+        self.chunk_size = int(self.options.get('chunk_size_mb', self.DEFAULT_CHUNK_SIZE_MB) * 1024 * 1024)
+        self.api_base = self.options.get('api_base', self.API_BASE)
+        self.governor = governor
+        self.bandwidth = bandwidth
+        self.transfer_options = transfer_options or {}
+        self.progress_callback = None
+        self.session = self._build_session(http_options or {})
+    
+    def _build_session(self, http_options):
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        
+        retries = http_options.get('retries', 3)
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=http_options.get('backoff_factor', 0.5),
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']),
+            raise_on_status=False,
+        )
+        adapter_options = {
+            'pool_connections': http_options.get('pool_connections', 4),
+            'pool_maxsize': http_options.get('pool_size', 10),
+            'pool_block': http_options.get('pool_block', False),
+            'max_retries': retry,
+        }
+        adapter = HTTPAdapter(**adapter_options)
+        if self.governor is not None:
+            adapter = GovernedAdapter(self.governor, adapter)
+        
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        if not http_options.get('keep_alive', True):
+            session.headers['Connection'] = 'close'
+        return session
+    
+    def close(self):
+        self.session.close()
+    
+    def preconnect(self):
+        try:
+            self.session.head(self.api_base, timeout=10)
+        except requests.RequestException as e:
+            logging.warning(f"Could not pre-open {self.PLATFORM} connection: {e}")
+    
+    def check_credentials(self):
+        with METRICS.stage('credentials', self.PLATFORM) as stage:
+            if self.credential_manager is None:
+                result = self.validate_credentials()
+            else:
+                result = self.credential_manager.validate(self.PLATFORM, self)
+            stage.set(outcome='ok' if result[0] else 'invalid')
+            return result
+    
+    def fetch_access_token(self):
+        return self.credentials.get('access_token'), None
+    
+    def access_token(self):
+        if self.credential_manager is None:
+            return self.fetch_access_token()[0]
+        return self.credential_manager.get_token(self.PLATFORM, self)
+    
+    def auth_failed(self, message):
+        if self.credential_manager is not None:
+            self.credential_manager.invalidate(self.PLATFORM)
+        raise AuthError(f"Authentication failed: {message}")
+    
+    def track(self, video_file, offset=0):
+        return TransferProgress(
+            self.PLATFORM, video_file, video_file.size, offset=offset,
+            callback=self.progress_callback, settings=self.transfer_options
+        )
+    
+    def send_timeout(self, nbytes):
+        stall_window = self.transfer_options.get('stall_window', TransferProgress.DEFAULT_STALL_WINDOW)
+        if self.bandwidth is None:
+            return stall_window, max(120, nbytes / (1024 * 512))
+        return stall_window, self.bandwidth.deadline(nbytes)
+    
+    def read_chunk(self, video_file, offset, length, consumer=None):
+        return video_file.read(consumer or self.PLATFORM, offset, length)
+    
+    def publish_time(self, video_file):
+        if self.MIN_SCHEDULE_LEAD is None or video_file.publish_at is None:
+            return None
+        if video_file.publish_at - time.time() < self.MIN_SCHEDULE_LEAD:
+            return None
+        return int(video_file.publish_at)
+    
+    def validate_credentials(self):
+        return True
+    
+    def upload(self, video_file):
+        raise NotImplementedError()
+
+class ResumableSessionError(Exception):
+    pass
+
+class FacebookUploader(PlatformUploader):
+    PLATFORM = 'meta'
+    API_BASE = 'https://graph.facebook.com/v18.0'
+    MAX_CHUNK_RETRIES = 3
+    MIN_SCHEDULE_LEAD = 10 * 60
+    AUTH_ERROR_CODES = (102, 190)
+    RATE_LIMIT_CODES = (4, 17, 32, 613)
+    SESSION_ERROR_CODES = (6000, 6001)
+    
+    def validate_credentials(self):
+        if not self.credentials.get('access_token'):
+            return False, "Missing access_token"
+        if not self.credentials.get('page_id') and not self.credentials.get('page_ids'):
+            return False, "Missing page_id"
+        
+        try:
+            test_url = f"{self.api_base}/{self.page_ids()[0]}"
+            params = {'access_token': self.credentials['access_token'], 'fields': 'id,name'}
+            response = self.session.get(test_url, params=params, timeout=10)
+            
+            if response.status_code == 200:
+                page_data = response.json()
+                page_name = page_data.get('name', 'Unknown')
+                logging.info(f"Facebook credentials valid. Connected to page: {page_name}")
+                return True, f"Connected to: {page_name}"
+            else:
+                error_data = response.json()
+                error_msg = error_data.get('error', {}).get('message', 'Unknown error')
+                logging.error(f"Facebook credential validation failed: {error_msg}")
+                return False, f"API Error: {error_msg}"
+        except Exception as e:
+            logging.error(f"Facebook credential validation error: {e}")
+            return False, f"Connection error: {str(e)}"
+    
+    def upload(self, video_file, page_ids=None):
+        if self.testing_mode:
+            emit("  [Testing Mode] Simulating upload...")
+            time.sleep(2)
+            return True
+        
+        is_valid, errors = video_file.validate(self.PLATFORM, self.options.get('limits'))
+        if not is_valid:
+            raise PermanentUploadError(f"Invalid video: {', '.join(errors)}")
+        
+        cred_valid, cred_error = self.check_credentials()
+        if not cred_valid:
+            raise PermanentUploadError(f"Invalid credentials: {cred_error}")
+        
+        emit(f"  Uploading {video_file.size / (1024*1024):.2f}MB...")
+        
+        page_ids = [page_id for page_id in self.page_ids() if page_ids is None or page_id in page_ids]
+        pending = []
+        for page_id in page_ids:
+            state = self.transfer_state.load(self._state_key(page_id), video_file) if self.transfer_state else None
+            if state and state.get('done'):
+                emit(f"  Page {page_id}: already uploaded (video {state['video_id']})")
+                video_file.remote_ids.setdefault(self.PLATFORM, []).append(state['video_id'])
+                video_file.remote_pages.setdefault(self.PLATFORM, {})[state['video_id']] = page_id
+            else:
+                pending.append(page_id)
+        
+        if len(pending) > 1:
+            buffer = getattr(_output, 'buffer', None)
+            
+            def upload_page(page_id):
+                _output.buffer = buffer
+                return self._upload_page(page_id, video_file)
+            
+            with concurrent.futures.ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix='meta-page') as executor:
+                futures = [executor.submit(upload_page, page_id) for page_id in pending]
+            errors = [future.exception() for future in futures if future.exception() is not None]
+            if errors:
+                raise next((e for e in errors if is_transient_error(e)), errors[0])
+        else:
+            for page_id in pending:
+                self._upload_page(page_id, video_file)
+        
+        if self.transfer_state:
+            for page_id in page_ids:
+                self.transfer_state.discard(self._state_key(page_id), video_file)
+        return True
+    
+    def page_ids(self):
+        return self.credentials.get('page_ids') or [self.credentials['page_id']]
+    
+    def _state_key(self, page_id):
+        if page_id == self.page_ids()[0]:
+            return self.PLATFORM
+        return f"{self.PLATFORM}:{page_id}"
+    
+    def _upload_page(self, page_id, video_file):
+        url = f"{self.api_base}/{page_id}/videos"
+        key = self._state_key(page_id)
+        prefix = f"  Page {page_id}: " if len(self.page_ids()) > 1 else "  "
+        
+        try:
+            state = self.transfer_state.load(key, video_file) if self.transfer_state else None
+            if state and state.get('page_id') == page_id:
+                emit(f"{prefix}Resuming upload at {state['start_offset'] / (1024*1024):.2f}MB")
+            else:
+                state = self._start_session(url, page_id, video_file)
+            
+            try:
+                state = self._transfer(url, video_file, state)
+            except ResumableSessionError as e:
+                logging.warning(f"Facebook upload session rejected, restarting: {e}")
+                if self.transfer_state:
+                    self.transfer_state.discard(key, video_file)
+                state = self._transfer(url, video_file, self._start_session(url, page_id, video_file))
+        finally:
+            video_file.release(key)
+        
+        self._finish_session(url, video_file, state)
+        
+        if self.transfer_state:
+            self.transfer_state.save(key, video_file, dict(state, done=True))
+        video_file.remote_ids.setdefault(self.PLATFORM, []).append(state['video_id'])
+        video_file.remote_pages.setdefault(self.PLATFORM, {})[state['video_id']] = page_id
+        
+        emit(f"{prefix}Upload successful! Video ID: {state['video_id']}")
+    
+    def _graph_error(self, response):
+        try:
+            error = response.json().get('error', {})
+        except ValueError:
+            return f"HTTP {response.status_code}"
+        
+        message = error.get('message', 'Unknown error')
+        if response.status_code == 401 or error.get('code') in self.AUTH_ERROR_CODES:
+            self.auth_failed(message)
+        return message
+    
+    def _upload_error(self, response):
+        message = f"Upload failed: {self._graph_error(response)}"
+        try:
+            code = response.json().get('error', {}).get('code')
+        except ValueError:
+            code = None
+        
+        if response.status_code == 429 or response.status_code >= 500 or code in self.RATE_LIMIT_CODES:
+            return TransientUploadError(message)
+        return PermanentUploadError(message)
+    
+    def _expected_offsets(self, response):
+        try:
+            error = response.json().get('error', {})
+        except ValueError:
+            return None
+        
+        error_data = error.get('error_data') or {}
+        if isinstance(error_data, str):
+            try:
+                error_data = json.loads(error_data)
+            except ValueError:
+                return None
+        if not isinstance(error_data, dict):
+            return None
+        try:
+            return int(error_data['start_offset']), int(error_data['end_offset'])
+        except (KeyError, TypeError, ValueError):
+            return None
+    
+    def _session_error(self, response):
+        try:
+            return response.json().get('error', {}).get('code') in self.SESSION_ERROR_CODES
+        except ValueError:
+            return False
+    
+    def _start_session(self, url, page_id, video_file):
+        data = {
+            'access_token': self.credentials['access_token'],
+            'upload_phase': 'start',
+            'file_size': video_file.size,
+        }
+        response = self.session.post(url, data=data, timeout=60)
+        
+        if response.status_code != 200:
+            raise self._upload_error(response)
+        
+        result = response.json()
+        if not result.get('upload_session_id') or not result.get('video_id'):
+            raise Exception("Upload start returned no session")
+        
+        state = {
+            'page_id': page_id,
+            'upload_session_id': result['upload_session_id'],
+            'video_id': result['video_id'],
+            'start_offset': int(result['start_offset']),
+            'end_offset': int(result['end_offset']),
+        }
+        if self.transfer_state:
+            self.transfer_state.save(self._state_key(page_id), video_file, state)
+        return state
+    
+    def _transfer(self, url, video_file, state):
+        key = self._state_key(state['page_id'])
+        progress = self.track(video_file, state['start_offset'])
+        failures = 0
+        
+        while state['start_offset'] < state['end_offset']:
+            start_offset = state['start_offset']
+            length = min(state['end_offset'] - start_offset, self.chunk_size)
+            chunk = self.read_chunk(video_file, start_offset, length, key)
+            
+            data = {
+                'access_token': self.credentials['access_token'],
+                'upload_phase': 'transfer',
+                'upload_session_id': state['upload_session_id'],
+                'start_offset': start_offset,
+            }
+            body, content_type = multipart_body(data, 'video_file_chunk', video_file.filename, chunk, progress)
+            timeout = self.send_timeout(length)
+            progress.start(start_offset, deadline=timeout[1])
+            
+            try:
+                response = self.session.post(url, data=body, headers={'Content-Type': content_type}, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout, StalledTransferError) as e:
+                if self.bandwidth is not None:
+                    self.bandwidth.observe(progress.sent - start_offset, time.time() - progress.started)
+                failures += 1
+                if failures > self.MAX_CHUNK_RETRIES:
+                    raise TransientUploadError(f"Upload interrupted at {start_offset} bytes: {e}")
+                logging.warning(f"Facebook chunk at {start_offset} failed ({e}), retrying")
+                time.sleep(2 ** failures)
+                continue
+            finally:
+                del chunk, body
+            
+            if response.status_code != 200:
+                error = self._upload_error(response)
+                if isinstance(error, TransientUploadError):
+                    raise error
+                
+                offsets = self._expected_offsets(response)
+                if offsets is not None and offsets[0] != start_offset and failures < self.MAX_CHUNK_RETRIES:
+                    failures += 1
+                    logging.warning(f"Facebook expected offset {offsets[0]} instead of {start_offset}, resuming there")
+                    state['start_offset'], state['end_offset'] = offsets
+                    if self.transfer_state:
+                        self.transfer_state.save(key, video_file, state)
+                    continue
+                if self._session_error(response):
+                    raise ResumableSessionError(str(error))
+                raise error
+            
+            if self.bandwidth is not None:
+                self.bandwidth.observe(length, time.time() - progress.started)
+            
+            result = response.json()
+            state['start_offset'] = int(result['start_offset'])
+            state['end_offset'] = int(result['end_offset'])
+            failures = 0
+            
+            if self.transfer_state:
+                self.transfer_state.save(key, video_file, state)
+        
+        return state
+    
+    def _finish_session(self, url, video_file, state):
+        data = {
+            'access_token': self.credentials['access_token'],
+            'upload_phase': 'finish',
+            'upload_session_id': state['upload_session_id'],
+            'title': video_file.name,
+            'description': video_file.name,
+        }
+        
+        if self.credentials.get('creative_folder_id'):
+            data['creative_folder_id'] = self.credentials['creative_folder_id']
+        
+        publish_at = self.publish_time(video_file)
+        if publish_at is not None:
+            data['published'] = 'false'
+            data['scheduled_publish_time'] = publish_at
+        
+        if self.credentials.get('crosspost_to_instagram', False):
+            data['crossposting_actions'] = json.dumps([{
+                'page': state['page_id'],
+                'should_upload_video_to_instagram': True
+            }])
+        
+        response = self.session.post(url, data=data, timeout=120)
+        
+        if response.status_code != 200:
+            raise self._upload_error(response)
+        
+        if not response.json().get('success'):
+            raise Exception("Upload finish was not acknowledged")
+    
+    def check_processing(self, video_ids):
+        fields = 'status,is_instagram_eligible' if self.credentials.get('crosspost_to_instagram') else 'status'
+        data = {
+            'access_token': self.credentials['access_token'],
+            'batch': json.dumps([{'method': 'GET', 'relative_url': f"{video_id}?fields={fields}"} for video_id in video_ids]),
+            'include_headers': 'false',
+        }
+        response = self.session.post(f"{self.api_base}/", data=data, timeout=60)
+        
+        if response.status_code != 200:
+            raise TransientUploadError(f"Status check failed: {self._graph_error(response)}")
+        
+        outcomes = {}
+        for video_id, item in zip(video_ids, response.json()):
+            if not item:
+                continue
+            try:
+                body = json.loads(item.get('body') or '{}')
+            except ValueError:
+                continue
+            
+            if item.get('code') != 200:
+                error = body.get('error', {})
+                if item.get('code', 500) >= 500 or error.get('code') in self.RATE_LIMIT_CODES:
+                    continue
+                outcomes[video_id] = ('failed', error.get('message', f"HTTP {item.get('code')}"))
+                continue
+            
+            status = body.get('status', {})
+            video_status = status.get('video_status')
+            if video_status in ('error', 'expired'):
+                errors = status.get('processing_phase', {}).get('errors') or [{}]
+                outcomes[video_id] = ('failed', errors[0].get('message', f"video status {video_status}"))
+            elif video_status == 'ready':
+                if body.get('is_instagram_eligible') is False:
+                    outcomes[video_id] = ('failed', "Instagram cross-posting rejected")
+                else:
+                    outcomes[video_id] = ('ready', None)
+            else:
+                outcomes[video_id] = ('processing', None)
+        return outcomes
+
+class TikTokUploader(PlatformUploader):
+    PLATFORM = 'tiktok'
+    API_BASE = 'https://open.tiktokapis.com'
+    MIN_CHUNK_SIZE = 5 * 1024 * 1024
+    MAX_CHUNK_SIZE = 64 * 1024 * 1024
+    MAX_CHUNK_RETRIES = 5
+    UPLOAD_URL_TTL = 3300
+    AUTH_ERROR_CODES = ('access_token_invalid',)
+    RATE_LIMIT_CODES = ('rate_limit_exceeded', 'spam_risk_too_many_pending_share')
+    PUBLISHED_STATUSES = ('PUBLISH_COMPLETE', 'SEND_TO_USER_INBOX')
+    CONTENT_TYPES = {
+        '.mp4': 'video/mp4',
+        '.mov': 'video/quicktime',
+        '.webm': 'video/webm',
+    }
+    
+    def validate_credentials(self):
+        if not self.credentials.get('access_token'):
+            return False, "Missing access_token"
         return True, "OK"
     
-    def upload(self, video_file):
-        if self.testing_mode:
-            print("  [Testing Mode] Simulating YouTube upload...")
-            time.sleep(2)
-            return True
-        
-        is_valid, errors = video_file.validate()
-        if not is_valid:
-            raise Exception(f"Invalid video: {', '.join(errors)}")
-        
-        cred_valid, cred_error = self.validate_credentials()
-        if not cred_valid:
-            raise Exception(f"Invalid credentials: {cred_error}")
+    def upload(self, video_file):
+        if self.testing_mode:
+            emit("  [Testing Mode] Simulating TikTok upload...")
+            time.sleep(2)
+            return True
+        
+        is_valid, errors = video_file.validate(self.PLATFORM, self.options.get('limits'))
+        if not is_valid:
+            raise PermanentUploadError(f"Invalid video: {', '.join(errors)}")
+        
+        cred_valid, cred_error = self.check_credentials()
+        if not cred_valid:
+            raise PermanentUploadError(f"Invalid credentials: {cred_error}")
+        
+        emit(f"  Uploading {video_file.size / (1024*1024):.2f}MB...")
+        
+        try:
+            state = self.transfer_state.load(self.PLATFORM, video_file) if self.transfer_state else None
+            if state and self._resumable(state, video_file):
+                if state['offset'] < video_file.size:
+                    emit(f"  Resuming upload at {state['offset'] / (1024*1024):.2f}MB")
+            else:
+                state = self._start_session(video_file)
+            
+            try:
+                self._transfer(video_file, state)
+            except ResumableSessionError as e:
+                logging.warning(f"TikTok upload URL rejected, restarting: {e}")
+                if self.transfer_state:
+                    self.transfer_state.discard(self.PLATFORM, video_file)
+                state = self._start_session(video_file)
+                self._transfer(video_file, state)
+        finally:
+            video_file.release(self.PLATFORM)
+        
+        status = self._wait_published(state['publish_id'])
+        
+        if self.transfer_state:
+            self.transfer_state.discard(self.PLATFORM, video_file)
+        
+        emit(f"  Upload successful! Publish ID: {state['publish_id']} ({status})")
+        return True
+    
+    def _headers(self, extra=None):
+        headers = {'Authorization': f"Bearer {self.access_token()}"}
+        headers.update(extra or {})
+        return headers
+    
+    def _error(self, response):
+        try:
+            error = response.json().get('error', {})
+        except ValueError:
+            error = {}
+        if not isinstance(error, dict):
+            error = {'message': str(error)}
+        
+        code = error.get('code')
+        message = error.get('message') or code or f"HTTP {response.status_code}"
+        
+        if response.status_code == 401 or code in self.AUTH_ERROR_CODES:
+            self.auth_failed(message)
+        if response.status_code == 429 or response.status_code >= 500 or code in self.RATE_LIMIT_CODES:
+            return TransientUploadError(f"Upload failed: {message}")
+        return PermanentUploadError(f"Upload failed: {message}")
+    
+    def _api_call(self, path, payload, timeout=60):
+        headers = self._headers({'Content-Type': 'application/json; charset=UTF-8'})
+        response = self.session.post(f"{self.api_base}{path}", data=json.dumps(payload), headers=headers, timeout=timeout)
+        
+        try:
+            code = response.json().get('error', {}).get('code', 'ok')
+        except (ValueError, AttributeError):
+            code = None
+        if response.status_code != 200 or code != 'ok':
+            raise self._error(response)
+        return response.json().get('data', {})
+    
+    def _chunk_size(self, size):
+        if size < self.MIN_CHUNK_SIZE:
+            return size
+        return min(size, max(self.MIN_CHUNK_SIZE, min(self.chunk_size, self.MAX_CHUNK_SIZE)))
+    
+    def _chunks(self, size, chunk_size):
+        count = max(1, size // chunk_size)
+        return [
+            (index * chunk_size, chunk_size if index < count - 1 else size - index * chunk_size)
+            for index in range(count)
+        ]
+    
+    def _resumable(self, state, video_file):
+        if state.get('offset', 0) >= video_file.size:
+            return True
+        return time.time() - state.get('created', 0) < self.UPLOAD_URL_TTL
+    
+    def _start_session(self, video_file):
+        chunk_size = self._chunk_size(video_file.size)
+        payload = {
+            'post_info': {
+                'title': video_file.name[:2200],
+                'privacy_level': self.options.get('privacy_level', 'SELF_ONLY'),
+                'disable_comment': False,
+                'disable_duet': False,
+                'disable_stitch': False,
+            },
+            'source_info': {
+                'source': 'FILE_UPLOAD',
+                'video_size': video_file.size,
+                'chunk_size': chunk_size,
+                'total_chunk_count': len(self._chunks(video_file.size, chunk_size)),
+            },
+        }
+        result = self._api_call('/v2/post/publish/video/init/', payload)
+        
+        if not result.get('publish_id') or not result.get('upload_url'):
+            raise Exception("Upload init returned no upload URL")
+        
+        state = {
+            'publish_id': result['publish_id'],
+            'upload_url': result['upload_url'],
+            'chunk_size': chunk_size,
+            'offset': 0,
+            'created': time.time(),
+        }
+        if self.transfer_state:
+            self.transfer_state.save(self.PLATFORM, video_file, state)
+        return state
+    
+    def _transfer(self, video_file, state):
+        chunks = [chunk for chunk in self._chunks(video_file.size, state['chunk_size']) if chunk[0] >= state['offset']]
+        if not chunks:
+            return
+        
+        progress = self.track(video_file, state['offset'])
+        prefetcher = ChunkPrefetcher(video_file, chunks, self.PLATFORM)
+        try:
+            for offset, length in chunks:
+                chunk = prefetcher.get()[1]
+                try:
+                    self._send_chunk(video_file, state, chunk, offset, progress)
+                finally:
+                    del chunk
+                    prefetcher.done()
+                
+                state['offset'] = offset + length
+                if self.transfer_state:
+                    self.transfer_state.save(self.PLATFORM, video_file, state)
+        finally:
+            prefetcher.close()
+        
+        logging.debug(f"TikTok upload of {video_file.filename} waited {prefetcher.wait_seconds:.1f}s on disk reads")
+    
+    def _send_chunk(self, video_file, state, chunk, offset, progress):
+        headers = {
+            'Content-Type': self.CONTENT_TYPES.get(video_file.extension, 'video/mp4'),
+            'Content-Length': str(len(chunk)),
+            'Content-Range': f"bytes {offset}-{offset + len(chunk) - 1}/{video_file.size}",
+        }
+        failures = 0
+        
+        while True:
+            body = ProgressReader([chunk], progress)
+            timeout = self.send_timeout(len(chunk))
+            progress.start(offset, deadline=timeout[1])
+            
+            try:
+                response = self.session.put(state['upload_url'], data=body, headers=headers, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout, StalledTransferError) as e:
+                response = None
+                error = e
+            finally:
+                del body
+            
+            if response is not None and response.status_code in (200, 201, 206):
+                if self.bandwidth is not None:
+                    self.bandwidth.observe(len(chunk), time.time() - progress.started)
+                return
+            
+            if response is not None:
+                if response.status_code in (403, 404, 410):
+                    raise ResumableSessionError(f"HTTP {response.status_code}")
+                error = self._error(response)
+                if isinstance(error, PermanentUploadError):
+                    raise error
+            elif self.bandwidth is not None:
+                self.bandwidth.observe(progress.sent - offset, time.time() - progress.started)
+            
+            failures += 1
+            if failures > self.MAX_CHUNK_RETRIES:
+                raise TransientUploadError(f"Upload interrupted at {offset} bytes: {error}")
+            logging.warning(f"TikTok chunk at {offset} failed ({error}), retrying")
+            time.sleep(min(60, 2 ** failures))
+    
+    def _wait_published(self, publish_id):
+        interval = self.options.get('status_poll_interval', 5)
+        deadline = time.time() + self.options.get('status_timeout', 600)
+        
+        while True:
+            result = self._api_call('/v2/post/publish/status/fetch/', {'publish_id': publish_id}, timeout=30)
+            status = result.get('status')
+            
+            if status in self.PUBLISHED_STATUSES:
+                return status
+            if status == 'FAILED':
+                raise PermanentUploadError(f"TikTok rejected the video: {result.get('fail_reason', 'unknown reason')}")
+            if time.time() >= deadline:
+                raise TransientUploadError(f"TikTok is still processing the video ({status})")
+            time.sleep(interval)
+
+class YouTubeUploader(PlatformUploader):
+    PLATFORM = 'youtube'
+    UPLOAD_COST = 1600
+    MIN_SCHEDULE_LEAD = 60
+    API_BASE = 'https://www.googleapis.com'
+    TOKEN_URL = 'https://oauth2.googleapis.com/token'
+    CHUNK_ALIGNMENT = 256 * 1024
+    MAX_CHUNK_RETRIES = 5
+    CONTENT_TYPES = {
+        '.mp4': 'video/mp4',
+        '.mov': 'video/quicktime',
+        '.mkv': 'video/x-matroska',
+        '.webm': 'video/webm',
+        '.avi': 'video/x-msvideo',
+        '.wmv': 'video/x-ms-wmv',
+        '.flv': 'video/x-flv',
+    }
+    QUOTA_REASONS = ('quotaExceeded', 'rateLimitExceeded', 'userRateLimitExceeded', 'uploadLimitExceeded')
+    
+    def validate_credentials(self):
+        if not self.credentials.get('client_id'):
+            return False, "Missing client_id"
+        if not self.credentials.get('client_secret'):
+            return False, "Missing client_secret"
+        if not self.credentials.get('refresh_token'):
+            return False, "Missing refresh_token"
+        return True, "OK"
+    
+    def fetch_access_token(self):
+        data = {
+            'client_id': self.credentials['client_id'],
+            'client_secret': self.credentials['client_secret'],
+            'refresh_token': self.credentials['refresh_token'],
+            'grant_type': 'refresh_token',
+        }
+        token_url = self.options.get('token_url', self.TOKEN_URL)
+        response = self.session.post(token_url, data=data, timeout=30)
+        
+        if response.status_code != 200:
+            try:
+                error_msg = response.json().get('error_description') or response.json().get('error', 'Unknown error')
+            except ValueError:
+                error_msg = f"HTTP {response.status_code}"
+            if response.status_code in (400, 401):
+                self.auth_failed(error_msg)
+            raise Exception(f"Token refresh failed: {error_msg}")
+        
+        result = response.json()
+        return result['access_token'], result.get('expires_in', 3600)
+    
+    def upload(self, video_file):
+        if self.testing_mode:
+            emit("  [Testing Mode] Simulating YouTube upload...")
+            time.sleep(2)
+            return True
+        
+        is_valid, errors = video_file.validate(self.PLATFORM, self.options.get('limits'))
+        if not is_valid:
+            raise PermanentUploadError(f"Invalid video: {', '.join(errors)}")
+        
+        cred_valid, cred_error = self.check_credentials()
+        if not cred_valid:
+            raise PermanentUploadError(f"Invalid credentials: {cred_error}")
+        
+        emit(f"  Uploading {video_file.size / (1024*1024):.2f}MB...")
+        
+        try:
+            state = self.transfer_state.load(self.PLATFORM, video_file) if self.transfer_state else None
+            offset = self._query_offset(state, video_file) if state else None
+            if offset is not None:
+                emit(f"  Resuming upload at {offset / (1024*1024):.2f}MB")
+            else:
+                state = self._start_session(video_file)
+                offset = 0
+            
+            try:
+                result = self._transfer(video_file, state, offset)
+            except ResumableSessionError as e:
+                logging.warning(f"YouTube upload session expired, restarting: {e}")
+                if self.transfer_state:
+                    self.transfer_state.discard(self.PLATFORM, video_file)
+                result = self._transfer(video_file, self._start_session(video_file), 0)
+        finally:
+            video_file.release(self.PLATFORM)
+        
+        if self.transfer_state:
+            self.transfer_state.discard(self.PLATFORM, video_file)
+        
+        emit(f"  Upload successful! Video ID: {result.get('id')}")
+        return True
+    
+    def _headers(self, extra=None):
+        headers = {'Authorization': f"Bearer {self.access_token()}"}
+        headers.update(extra or {})
+        return headers
+    
+    def _error(self, response):
+        try:
+            error = response.json().get('error', {})
+        except ValueError:
+            error = {}
+        if not isinstance(error, dict):
+            error = {'message': str(error)}
+        
+        message = error.get('message') or f"HTTP {response.status_code}"
+        reasons = [item.get('reason') for item in error.get('errors', []) if isinstance(item, dict)]
+        
+        if response.status_code == 401:
+            self.auth_failed(message)
+        if response.status_code == 429 or response.status_code >= 500 or any(r in self.QUOTA_REASONS for r in reasons):
+            return TransientUploadError(f"Upload failed: {message}")
+        return PermanentUploadError(f"Upload failed: {message}")
+    
+    def _start_session(self, video_file):
+        metadata = {
+            'snippet': {
+                'title': video_file.name[:100],
+                'description': video_file.name,
+                'categoryId': str(self.options.get('category_id', '22')),
+            },
+            'status': {
+                'privacyStatus': self.options.get('privacy_status', 'public'),
+                'selfDeclaredMadeForKids': False,
+            },
+        }
+        publish_at = self.publish_time(video_file)
+        if publish_at is not None:
+            metadata['status']['privacyStatus'] = 'private'
+            metadata['status']['publishAt'] = datetime.datetime.fromtimestamp(publish_at, pytz.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        headers = self._headers({
+            'Content-Type': 'application/json; charset=UTF-8',
+            'X-Upload-Content-Length': str(video_file.size),
+            'X-Upload-Content-Type': self.CONTENT_TYPES.get(video_file.extension, 'video/*'),
+        })
+        url = f"{self.api_base}/upload/youtube/v3/videos"
+        params = {'uploadType': 'resumable', 'part': 'snippet,status'}
+        response = self.session.post(url, params=params, data=json.dumps(metadata), headers=headers, timeout=60)
+        
+        if response.status_code != 200:
+            raise self._error(response)
+        
+        session_uri = response.headers.get('Location')
+        if not session_uri:
+            raise Exception("Upload start returned no session URI")
+        
+        state = {'session_uri': session_uri}
+        if self.transfer_state:
+            self.transfer_state.save(self.PLATFORM, video_file, state)
+        return state
+    
+    def _received(self, response):
+        byte_range = response.headers.get('Range')
+        if not byte_range:
+            return 0
+        return int(byte_range.rsplit('-', 1)[-1]) + 1
+    
+    def _query_offset(self, state, video_file):
+        headers = self._headers({'Content-Range': f"bytes */{video_file.size}", 'Content-Length': '0'})
+        try:
+            response = self.session.put(state['session_uri'], headers=headers, timeout=60)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise TransientUploadError(f"Could not query upload status: {e}")
+        
+        if response.status_code == 308:
+            return self._received(response)
+        if response.status_code in (200, 201):
+            return video_file.size
+        if response.status_code in (404, 410):
+            return None
+        raise self._error(response)
+    
+    def _chunk_size(self):
+        return max(self.CHUNK_ALIGNMENT, self.chunk_size // self.CHUNK_ALIGNMENT * self.CHUNK_ALIGNMENT)
+    
+    def _transfer(self, video_file, state, offset):
+        progress = self.track(video_file, offset)
+        chunk_size = self._chunk_size()
+        failures = 0
+        
+        while True:
+            length = min(chunk_size, video_file.size - offset)
+            if length > 0:
+                chunk = self.read_chunk(video_file, offset, length)
+                content_range = f"bytes {offset}-{offset + length - 1}/{video_file.size}"
+            else:
+                chunk = b''
+                content_range = f"bytes */{video_file.size}"
+            
+            headers = self._headers({'Content-Range': content_range, 'Content-Length': str(length)})
+            body = ProgressReader([chunk], progress)
+            timeout = self.send_timeout(length)
+            progress.start(offset, deadline=timeout[1])
+            
+            try:
+                response = self.session.put(state['session_uri'], data=body, headers=headers, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout, StalledTransferError) as e:
+                response = None
+                error = e
+            finally:
+                del chunk, body
+            
+            if response is not None and response.status_code in (200, 201):
+                if self.bandwidth is not None:
+                    self.bandwidth.observe(length, time.time() - progress.started)
+                return response.json()
+            
+            if response is not None and response.status_code == 308:
+                received = self._received(response)
+                if received > offset:
+                    if self.bandwidth is not None:
+                        self.bandwidth.observe(received - offset, time.time() - progress.started)
+                    failures = 0
+                    offset = received
+                    if self.transfer_state:
+                        self.transfer_state.save(self.PLATFORM, video_file, dict(state, offset=offset))
+                    continue
+                error = f"server acknowledged {received} bytes, no progress past {offset}"
+            elif response is not None:
+                if response.status_code in (404, 410):
+                    raise ResumableSessionError(f"HTTP {response.status_code}")
+                error = self._error(response)
+                if isinstance(error, PermanentUploadError):
+                    raise error
+            
+            failures += 1
+            if failures > self.MAX_CHUNK_RETRIES:
+                raise TransientUploadError(f"Upload interrupted at {offset} bytes: {error}")
+            logging.warning(f"YouTube chunk at {offset} failed ({error}), checking upload status")
+            time.sleep(min(60, 2 ** failures))
+            
+            received = self._query_offset(state, video_file)
+            if received is None:
+                raise ResumableSessionError("Upload session expired")
+            offset = received
+
+class JournalFile:
+    def __init__(self, path):
+        self.path = path
+        self.handle = None
+        self.lines = 0
+        self.position = 0
+        self.inode = None
+        self.lock = FileLock(path + '.lock')
+    
+    def exists(self):
+        return os.path.exists(self.path)
+    
+    def read(self):
+        self.lines = 0
+        self.position = 0
+        self.inode = None
+        if not self.exists():
+            return
+        
+        with open(self.path, 'rb') as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            yield from self._records(f)
+    
+    def read_new(self):
+        with open(self.path, 'rb') as f:
+            f.seek(self.position)
+            yield from self._records(f)
+    
+    def _records(self, f):
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            self.position += len(line)
+            line = line.strip()
+            if not line:
+                continue
+            self.lines += 1
+            try:
+                yield json.loads(line)
+            except ValueError:
+                logging.warning(f"Skipping corrupt record in {self.path}")
+    
+    def changed(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return self.inode is not None
+        return stat.st_ino != self.inode or stat.st_size != self.position
+    
+    def replaced(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+        return stat.st_ino != self.inode or stat.st_size < self.position
+    
+    def append(self, record):
+        data = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        with self.lock:
+            if self.handle is not None and (self.replaced() or self._handle_stale()):
+                self.close()
+            if self.handle is None:
+                self.handle = open(self.path, 'ab')
+                if self.inode is None:
+                    self.inode = os.fstat(self.handle.fileno()).st_ino
+            
+            end = os.fstat(self.handle.fileno()).st_size
+            self.handle.write(data)
+            self.handle.flush()
+            os.fsync(self.handle.fileno())
+            if self.position == end:
+                self.position = end + len(data)
+            self.lines += 1
+    
+    def _handle_stale(self):
+        try:
+            return os.fstat(self.handle.fileno()).st_ino != os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return True
+    
+    def rewrite(self, records):
+        with self.lock:
+            self.close()
+            temp_file = self.path + '.tmp'
+            count = 0
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    count += 1
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, self.path)
+            
+            stat = os.stat(self.path)
+            self.inode = stat.st_ino
+            self.position = stat.st_size
+            self.lines = count
+    
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+
+class HistoryStore:
+    COMPACT_MIN_LINES = 1000
+    COMPACT_RATIO = 2
+    
+    def __init__(self, journal_file, legacy_file=None):
+        self.journal_file = journal_file
+        self.legacy_file = legacy_file
+        self.index = {}
+        self.fingerprint_index = {}
+        self.journal = JournalFile(journal_file)
+        self.lock = threading.RLock()
+        self.load()
+    
+    def _key(self, entry):
+        return (entry['video_path'], entry['platform'])
+    
+    def _put(self, key, entry):
+        previous = self.index.pop(key, None)
+        if previous is not None and previous.get('fingerprint'):
+            fingerprint_key = (previous['fingerprint'], previous['platform'])
+            if self.fingerprint_index.get(fingerprint_key) is previous:
+                del self.fingerprint_index[fingerprint_key]
+        
+        self.index[key] = entry
+        if entry.get('fingerprint') and not entry.get('reupload'):
+            self.fingerprint_index[(entry['fingerprint'], entry['platform'])] = entry
+    
+    def load(self):
+        with self.lock, self.journal.lock:
+            self.index = {}
+            self.fingerprint_index = {}
+            
+            if not self.journal.exists():
+                if self.legacy_file and os.path.exists(self.legacy_file):
+                    self.migrate()
+                return
+            
+            self._apply(self.journal.read())
+    
+    def _apply(self, entries):
+        for entry in entries:
+            try:
+                key = self._key(entry)
+            except (KeyError, TypeError):
+                logging.warning(f"Skipping corrupt history record in {self.journal_file}")
+                continue
+            self._put(key, entry)
+    
+    def refresh(self):
+        with self.lock:
+            if not self.journal.changed():
+                return
+            
+            with self.journal.lock:
+                if self.journal.replaced():
+                    self.load()
+                else:
+                    self._apply(self.journal.read_new())
+    
+    def migrate(self):
+        try:
+            with open(self.legacy_file, 'r') as f:
+                legacy_entries = json.load(f)
+        except Exception as e:
+            logging.error(f"Could not read legacy history {self.legacy_file}: {e}")
+            return
+        
+        for entry in legacy_entries:
+            try:
+                key = self._key(entry)
+            except (KeyError, TypeError):
+                continue
+            self._put(key, entry)
+        
+        self.compact()
+        os.replace(self.legacy_file, self.legacy_file + '.migrated')
+        logging.info(f"Migrated {len(self.index)} history entries from {self.legacy_file} to {self.journal_file}")
+    
+    def get(self, video_path, platform):
+        return self.index.get((video_path, platform))
+    
+    def contains(self, video_path, platform):
+        entry = self.index.get((video_path, platform))
+        return entry is not None and not entry.get('reupload')
+    
+    def contains_fingerprint(self, fingerprint, platform):
+        return (fingerprint, platform) in self.fingerprint_index
+    
+    def entries(self):
+        with self.lock:
+            return list(self.index.values())
+    
+    def __len__(self):
+        return len(self.index)
+    
+    def append(self, entry):
+        with self.lock, self.journal.lock:
+            self.refresh()
+            self._write(entry)
+    
+    def update(self, video_path, platform, fields):
+        with self.lock, self.journal.lock:
+            self.refresh()
+            entry = self.index.get((video_path, platform))
+            if entry is None:
+                return None
+            entry = dict(entry, **fields)
+            self._write(entry)
+            return entry
+    
+    def _write(self, entry):
+        self.journal.append(entry)
+        self._put(self._key(entry), entry)
+        
+        if self.journal.lines > max(self.COMPACT_MIN_LINES, len(self.index) * self.COMPACT_RATIO):
+            self.compact()
+    
+    def compact(self):
+        with self.lock, self.journal.lock:
+            if self.journal.exists():
+                self.refresh()
+            self.journal.rewrite(self.index.values())
+    
+    def clear(self):
+        with self.lock, self.journal.lock:
+            self.index = {}
+            self.fingerprint_index = {}
+            self.journal.rewrite([])
+    
+    def close(self):
+        with self.lock:
+            self.journal.close()
+
+class Fingerprinter:
+    SAMPLE_SIZE = 64 * 1024
+    SAMPLE_COUNT = 16
+    FULL_HASH_BLOCK = 1024 * 1024
+    CACHE_EXPIRY_DAYS = 30
+    
+    def __init__(self, cache_file, full_hash=False):
+        self.cache_file = cache_file
+        self.full_hash = full_hash
+        self.lock = threading.Lock()
+        self.cache = {}
+        self.dirty = False
+        if os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, 'r') as f:
+                    self.cache = json.load(f)
+            except Exception as e:
+                logging.warning(f"Ignoring unreadable fingerprint cache {self.cache_file}: {e}")
+    
+    def fingerprint(self, path, entry=None):
+        stat = os.stat(path)
+        entry = ScanEntry(path, stat.st_size, stat.st_mtime, stat.st_ino)
+        if entry.size == 0:
+            raise ValueError("File is empty")
+        
+        key = f"{entry.inode}:{entry.size}:{entry.mtime}"
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached and cached['fingerprint'].startswith(self._mode()):
+                cached['seen'] = int(time.time())
+                self.dirty = True
+                return cached['fingerprint']
+        
+        fingerprint = self._compute(path, entry.size)
+        stat = os.stat(path)
+        if (stat.st_size, stat.st_mtime, stat.st_ino) != (entry.size, entry.mtime, entry.inode):
+            raise ValueError("File changed while fingerprinting")
+        with self.lock:
+            self.cache[key] = {'fingerprint': fingerprint, 'seen': int(time.time())}
+            self.dirty = True
+        return fingerprint
+    
+    def _mode(self):
+        return 'full' if self.full_hash else 'sampled'
+    
+    def _compute(self, path, size):
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(str(size).encode())
+        
+        with open(path, 'rb') as f:
+            if self.full_hash:
+                for block in iter(lambda: f.read(self.FULL_HASH_BLOCK), b''):
+                    digest.update(block)
+            elif size > 0:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    if size <= self.SAMPLE_SIZE * self.SAMPLE_COUNT:
+                        digest.update(mapped[:])
+                    else:
+                        step = (size - self.SAMPLE_SIZE) // (self.SAMPLE_COUNT - 1)
+                        for i in range(self.SAMPLE_COUNT):
+                            offset = i * step
+                            digest.update(mapped[offset:offset + self.SAMPLE_SIZE])
+        
+        return f"{self._mode()}:{size}:{digest.hexdigest()}"
+    
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            cutoff = time.time() - self.CACHE_EXPIRY_DAYS * 86400
+            self.cache = {key: value for key, value in self.cache.items() if value.get('seen', 0) >= cutoff}
+            snapshot = dict(self.cache)
+            self.dirty = False
+        
+        temp_file = self.cache_file + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(temp_file, self.cache_file)
+
+class StatsRollup:
+    PLATFORMS = ('meta', 'tiktok', 'youtube')
+    RETENTION_DAYS = 400
+    CHECKPOINT_LINES = 500
+    
+    def __init__(self, state_file):
+        self.state_file = state_file
+        self.journal = JournalFile(os.path.splitext(state_file)[0] + '.jsonl')
+        self.lock = threading.RLock()
+        self.file_lock = self.journal.lock
+        self.totals = {}
+        self.days = {}
+        with self.file_lock:
+            self.loaded = self._load()
+    
+    def _load(self):
+        self.totals = {}
+        self.days = {}
+        loaded = False
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r') as f:
+                    data = json.load(f)
+                self.totals = data.get('totals', {})
+                self.days = data.get('days', {})
+                loaded = True
+            except Exception as e:
+                logging.warning(f"Rebuilding unreadable stats {self.state_file}: {e}")
+        
+        self._apply(self.journal.read())
+        return loaded
+    
+    def _apply(self, records):
+        for record in records:
+            try:
+                self._record(record['day'], record['platform'], record['folder'], record['uploads'],
+                             record['failures'], record['bytes'], record['seconds'])
+            except (KeyError, TypeError):
+                logging.warning(f"Skipping corrupt stats record in {self.journal.path}")
+    
+    def refresh(self):
+        with self.lock:
+            if not self.journal.changed():
+                return
+            
+            with self.file_lock:
+                if self.journal.replaced():
+                    self._load()
+                else:
+                    self._apply(self.journal.read_new())
+    
+    def save(self):
+        temp_file = self.state_file + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump({'totals': self.totals, 'days': self.days}, f, separators=(',', ':'))
+        os.replace(temp_file, self.state_file)
+    
+    def checkpoint(self):
+        with self.lock, self.file_lock:
+            self.refresh()
+            self._prune()
+            self.save()
+            self.journal.rewrite([])
+    
+    def close(self):
+        with self.lock:
+            if self.journal.lines:
+                self.checkpoint()
+            self.journal.close()
+    
+    def _platform(self, platform):
+        if platform == 'facebook' or platform == 'instagram':
+            return 'meta'
+        return platform
+    
+    def _add(self, counters, key, uploads, failures, bytes_sent, seconds):
+        entry = counters.setdefault(key, {'uploads': 0, 'failures': 0, 'bytes': 0, 'seconds': 0.0})
+        entry['uploads'] += uploads
+        entry['failures'] += failures
+        entry['bytes'] += bytes_sent
+        entry['seconds'] += seconds
+    
+    def _record(self, day, platform, folder, uploads, failures, bytes_sent, seconds):
+        platform = self._platform(platform)
+        bucket = self.days.setdefault(day, {'platforms': {}, 'folders': {}})
+        self._add(self.totals, platform, uploads, failures, bytes_sent, seconds)
+        self._add(bucket['platforms'], platform, uploads, failures, bytes_sent, seconds)
+        self._add(bucket['folders'].setdefault(folder or '', {}), platform, uploads, failures, bytes_sent, seconds)
+    
+    def record(self, platform, folder, success, bytes_sent=0, seconds=0.0, day=None):
+        day = day or datetime.date.today().isoformat()
+        record = {
+            'day': day,
+            'platform': self._platform(platform),
+            'folder': folder or '',
+            'uploads': 1 if success else 0,
+            'failures': 0 if success else 1,
+            'bytes': bytes_sent if success else 0,
+            'seconds': seconds if success else 0.0,
+        }
+        with self.lock, self.file_lock:
+            self.refresh()
+            self.journal.append(record)
+            self._apply([record])
+            if self.journal.lines > self.CHECKPOINT_LINES:
+                self.checkpoint()
+    
+    def rebuild(self, entries):
+        with self.lock, self.file_lock:
+            self.totals = {}
+            self.days = {}
+            for entry in entries:
+                day = entry.get('upload_date', '')[:10] or datetime.date.today().isoformat()
+                self._record(
+                    day, entry['platform'], os.path.dirname(entry['video_path']),
+                    1, 0, entry.get('bytes', 0), entry.get('duration', 0.0)
+                )
+            self._prune()
+            self.save()
+            self.journal.rewrite([])
+    
+    def _prune(self):
+        cutoff = (datetime.date.today() - datetime.timedelta(days=self.RETENTION_DAYS)).isoformat()
+        for day in [day for day in self.days if day < cutoff]:
+            del self.days[day]
+    
+    def totals_by_platform(self):
+        self.refresh()
+        with self.lock:
+            return {platform: dict(counters) for platform, counters in self.totals.items()}
+    
+    def counts(self):
+        stats = {'meta': 0, 'tiktok': 0, 'youtube': 0, 'total': 0}
+        
+        for platform, counters in self.totals_by_platform().items():
+            if platform in stats:
+                stats[platform] += counters['uploads']
+            stats['total'] += counters['uploads']
+        
+        return stats
+    
+    def query(self, days=None, platform=None, folder=None, today=None):
+        today = today or datetime.date.today()
+        start = (today - datetime.timedelta(days=days - 1)).isoformat() if days else None
+        platform = self._platform(platform) if platform else None
+        
+        result = {'platforms': {}, 'days': {}}
+        self.refresh()
+        with self.lock:
+            for day, bucket in self.days.items():
+                if start is not None and day < start:
+                    continue
+                
+                if folder is not None:
+                    counters = bucket['folders'].get(folder, {})
+                else:
+                    counters = bucket['platforms']
+                
+                for name, values in counters.items():
+                    if platform is not None and name != platform:
+                        continue
+                    self._add(result['platforms'], name, values['uploads'], values['failures'],
+                              values['bytes'], values['seconds'])
+                    self._add(result['days'], day, values['uploads'], values['failures'],
+                              values['bytes'], values['seconds'])
+        
+        result['days'] = dict(sorted(result['days'].items()))
+        total = {}
+        for values in result['platforms'].values():
+            self._add(total, 'total', values['uploads'], values['failures'], values['bytes'], values['seconds'])
+        result['total'] = total.get('total', {'uploads': 0, 'failures': 0, 'bytes': 0, 'seconds': 0.0})
+        
+        for counters in itertools.chain(result['platforms'].values(), result['days'].values(), [result['total']]):
+            counters['throughput_mbps'] = round(counters['bytes'] * 8 / counters['seconds'] / 1e6, 2) if counters['seconds'] else None
+        return result
+    
+    def clear(self):
+        with self.lock, self.file_lock:
+            self.totals = {}
+            self.days = {}
+            self.save()
+            self.journal.rewrite([])
+
+class Statistics:
+    def __init__(self, config):
+        self.config = config
+        self.history = HistoryStore(config.history_journal, legacy_file=config.history_file)
+        self.rollup = StatsRollup(config.stats_file)
+        if not self.rollup.loaded:
+            self.rollup.rebuild(self.history.entries())
+        self.fingerprinter = None
+        self.configure()
+    
+    def configure(self):
+        settings = self.config.fingerprinting
+        if not settings.get('enabled', True):
+            if self.fingerprinter is not None:
+                self.fingerprinter.save()
+            self.fingerprinter = None
+        elif self.fingerprinter is None:
+            self.fingerprinter = Fingerprinter(
+                self.config.fingerprint_cache_file, full_hash=settings.get('full_hash', False)
+            )
+        else:
+            self.fingerprinter.full_hash = settings.get('full_hash', False)
+    
+    def fingerprint(self, video_path, entry=None):
+        if self.fingerprinter is None:
+            return None
+        try:
+            return self.fingerprinter.fingerprint(video_path, entry)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not fingerprint {video_path}: {e}")
+            return None
+    
+    def is_uploaded(self, video_path, platform, fingerprint=None):
+        if self.history.contains(video_path, platform):
+            return True
+        return fingerprint is not None and self.history.contains_fingerprint(fingerprint, platform)
+    
+    def record_upload(self, video_path, platform, status='success', fingerprint=None, folder=None,
+                      bytes_sent=0, duration=None, video_ids=None, processing=None, reuploads=None, pages=None):
+        entry = {
+            'video_path': video_path,
+            'platform': platform,
+            'upload_date': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'status': status
+        }
+        if fingerprint:
+            entry['fingerprint'] = fingerprint
+        if duration is not None:
+            entry['bytes'] = bytes_sent
+            entry['duration'] = round(duration, 3)
+        if video_ids:
+            entry['video_ids'] = video_ids
+        if pages:
+            entry['pages'] = pages
+        if processing:
+            entry['processing'] = processing
+        if reuploads:
+            entry['reuploads'] = reuploads
+        with METRICS.stage('record', platform):
+            self.history.append(entry)
+            self.rollup.record(platform, folder or os.path.dirname(video_path), True, bytes_sent, duration or 0.0)
+    
+    def record_processing(self, video_path, platform, outcome, seconds, error=None, reupload=False):
+        fields = {'processing': outcome, 'processing_seconds': round(seconds, 1)}
+        if error:
+            fields['processing_error'] = error
+        if reupload:
+            fields['reupload'] = True
+        return self.history.update(video_path, platform, fields)
+    
+    def record_failure(self, video_path, platform, folder=None):
+        self.rollup.record(platform, folder or os.path.dirname(video_path), False)
+    
+    def get_stats(self):
+        return self.rollup.counts()
+    
+    def query(self, days=None, platform=None, folder=None):
+        return self.rollup.query(days=days, platform=platform, folder=folder)
+    
+    def refresh(self):
+        self.history.refresh()
+    
+    def clear_history(self):
+        self.history.clear()
+        self.rollup.clear()
+
+class JobQueue:
+    COMPACT_MIN_LINES = 200
+    DEFAULT_MAX_ATTEMPTS = 5
+    DEFAULT_BASE_DELAY = 30
+    DEFAULT_MAX_DELAY = 3600
+    FAILED_RETENTION_DAYS = 7
+    ACTIVE_STATES = ('pending', 'running', 'retry')
+    
+    def __init__(self, journal_file, settings):
+        self.journal = JournalFile(journal_file)
+        self.settings = settings
+        self.lock = threading.RLock()
+        self.jobs = {}
+        self.wakeup = threading.Event()
+        self.random = random.Random()
+        self.load()
+    
+    def load(self):
+        with self.lock:
+            self.jobs = {}
+            for record in self.journal.read():
+                if isinstance(record, dict) and 'id' in record:
+                    self.jobs[record['id']] = record
+            
+            interrupted = [job for job in self.jobs.values() if job['state'] == 'running']
+            for job in interrupted:
+                self._write(dict(job, state='pending'))
+            if interrupted:
+                logging.info(f"Recovered {len(interrupted)} interrupted upload jobs")
+            
+            self._compact_if_needed()
+    
+    def _write(self, job):
+        job['updated'] = time.time()
+        self.jobs[job['id']] = job
+        self.journal.append(job)
+    
+    def enqueue(self, video_path, folder, platform, pages=None):
+        with self.lock:
+            job_id = f"{platform}:{video_path}"
+            job = self.jobs.get(job_id)
+            if job is not None and job['state'] in self.ACTIVE_STATES:
+                return job
+            
+            job = {
+                'id': job_id,
+                'video_path': video_path,
+                'folder': folder,
+                'platform': platform,
+                'state': 'pending',
+                'attempts': 0,
+                'next_attempt': time.time(),
+                'last_error': None,
+                'created': time.time(),
+            }
+            if pages:
+                job['pages'] = pages
+            self._write(job)
+            return job
+    
+    def claim_due(self, now=None):
+        now = now or time.time()
+        with self.lock:
+            due = [job for job in self.jobs.values()
+                   if job['state'] in ('pending', 'retry') and job['next_attempt'] <= now]
+            claimed = []
+            for job in due:
+                job = dict(job, state='running')
+                self._write(job)
+                claimed.append(job)
+            return claimed
+    
+    def complete(self, job):
+        with self.lock:
+            self._write(dict(job, state='done', last_error=None))
+            self._compact_if_needed()
+    
+    def fail(self, job, error, transient):
+        max_attempts = self.settings.get('max_attempts', self.DEFAULT_MAX_ATTEMPTS)
+        attempts = job['attempts'] + 1
+        
+        with self.lock:
+            if transient and attempts < max_attempts:
+                job = dict(job, state='retry', attempts=attempts, last_error=str(error),
+                           next_attempt=time.time() + self.backoff(attempts))
+            else:
+                job = dict(job, state='failed', attempts=attempts, last_error=str(error))
+                logging.error(f"Upload job {job['id']} failed permanently after {attempts} attempt(s): {error}")
+            self._write(job)
+        
+        self.wakeup.set()
+        return job
+    
+    def backoff(self, attempts):
+        base_delay = self.settings.get('base_delay', self.DEFAULT_BASE_DELAY)
+        max_delay = self.settings.get('max_delay', self.DEFAULT_MAX_DELAY)
+        delay = min(max_delay, base_delay * 2 ** (attempts - 1))
+        return delay / 2 + self.random.uniform(0, delay / 2)
+    
+    def state(self, video_path, platform):
+        with self.lock:
+            job = self.jobs.get(f"{platform}:{video_path}")
+        return job['state'] if job else None
+    
+    def defer(self, job, delay):
+        with self.lock:
+            self._write(dict(job, state='retry', next_attempt=time.time() + delay))
+        self.wakeup.set()
+    
+    def next_due(self):
+        with self.lock:
+            due_times = [job['next_attempt'] for job in self.jobs.values() if job['state'] in ('pending', 'retry')]
+        return min(due_times) if due_times else None
+    
+    def counts(self):
+        with self.lock:
+            return dict(collections.Counter(job['state'] for job in self.jobs.values()))
+    
+    def _compact_if_needed(self):
+        active = sum(1 for job in self.jobs.values() if job['state'] != 'done')
+        if self.journal.lines <= max(self.COMPACT_MIN_LINES, active * 2):
+            return
+        
+        cutoff = time.time() - self.FAILED_RETENTION_DAYS * 86400
+        self.jobs = {
+            job_id: job for job_id, job in self.jobs.items()
+            if job['state'] in self.ACTIVE_STATES or (job['state'] == 'failed' and job['updated'] >= cutoff)
+        }
+        self.journal.rewrite(self.jobs.values())
+
+class UploadScheduler:
+    MAX_SLEEP = 3600
+    DEFAULT_MISSED_GRACE_HOURS = 6
+    DEFAULT_WARMUP_MINUTES = 10
+    
+    def __init__(self, config, state_file):
+        self.config = config
+        self.state_file = state_file
+        self.wakeup = threading.Event()
+        self.running = False
+        self.last_fire = self._load_state()
+        self.warmed_slot = None
+    
+    def _load_state(self):
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r') as f:
+                    last_fire = json.load(f).get('last_fire')
+                if last_fire is not None:
+                    return datetime.datetime.fromtimestamp(last_fire, pytz.utc)
+            except Exception as e:
+                logging.warning(f"Ignoring unreadable scheduler state {self.state_file}: {e}")
+        return None
+    
+    def _save_state(self):
+        temp_file = self.state_file + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump({'last_fire': self.last_fire.timestamp()}, f)
+        os.replace(temp_file, self.state_file)
+    
+    def timezone(self):
+        try:
+            return pytz.timezone(self.config.timezone)
+        except pytz.UnknownTimeZoneError:
+            logging.error(f"Unknown timezone {self.config.timezone}, using UTC")
+            return pytz.utc
+    
+    def slots(self):
+        configured = self.config.scheduler.get('slots') or [
+            {'name': 'morning', 'time': self.config.morning_time},
+            {'name': 'night', 'time': self.config.night_time},
+        ]
+        
+        slots = []
+        for slot in configured:
+            if isinstance(slot, str):
+                slot = {'name': slot, 'time': slot}
+            try:
+                slot_time = datetime.datetime.strptime(slot['time'], '%H:%M').time()
+            except (KeyError, ValueError):
+                logging.error(f"Ignoring invalid schedule slot: {slot}")
+                continue
+            slots.append((slot.get('name', slot['time']), slot_time))
+        return slots
+    
+    def _localize(self, tz, day, slot_time):
+        naive = datetime.datetime.combine(day, slot_time)
+        try:
+            return tz.localize(naive, is_dst=None)
+        except pytz.NonExistentTimeError:
+            return tz.normalize(tz.localize(naive, is_dst=False))
+        except pytz.AmbiguousTimeError:
+            return tz.localize(naive, is_dst=True)
+    
+    def occurrences(self, start, end):
+        tz = self.timezone()
+        slots = self.slots()
+        day = start.astimezone(tz).date() - datetime.timedelta(days=1)
+        last_day = end.astimezone(tz).date() + datetime.timedelta(days=1)
+        
+        fires = []
+        while day <= last_day:
+            for name, slot_time in slots:
+                fire_time = self._localize(tz, day, slot_time)
+                if start < fire_time <= end:
+                    fires.append((fire_time, name))
+            day += datetime.timedelta(days=1)
+        
+        fires.sort()
+        return fires
+    
+    def next_fire(self, now=None):
+        now = now or datetime.datetime.now(pytz.utc)
+        fires = self.occurrences(now, now + datetime.timedelta(days=2))
+        return fires[0] if fires else None
+    
+    def run(self, callback, lead=None, warmup=None):
+        self.running = True
+        self.wakeup.clear()
+        
+        if self.last_fire is None:
+            self.last_fire = datetime.datetime.now(pytz.utc)
+            self._save_state()
+        elif self.config.scheduler.get('run_missed'):
+            self._run_missed(callback)
+        
+        while self.running:
+            now = datetime.datetime.now(pytz.utc)
+            upcoming = self.next_fire(max(now, self.last_fire))
+            warmup_seconds = self.config.scheduler.get('warmup_minutes', self.DEFAULT_WARMUP_MINUTES) * 60 if warmup else 0
+            start_at, planned = self._start_time(upcoming, now, lead, warmup_seconds)
+            
+            wake_at = start_at
+            if planned and warmup_seconds and self.warmed_slot != upcoming[0]:
+                wake_at = start_at - datetime.timedelta(seconds=warmup_seconds)
+            
+            if upcoming is None:
+                timeout = self.MAX_SLEEP
+            else:
+                timeout = min((wake_at - now).total_seconds(), self.MAX_SLEEP)
+            
+            if timeout > 0 and self.wakeup.wait(timeout):
+                self.wakeup.clear()
+                continue
+            
+            if not self.running or upcoming is None or not planned:
+                continue
+            
+            fire_time, name = upcoming
+            now = datetime.datetime.now(pytz.utc)
+            if wake_at < start_at and now >= wake_at:
+                self._warm_up(warmup, name, fire_time)
+            elif now >= start_at:
+                self._fire(callback, name, fire_time)
+    
+    def _start_time(self, upcoming, now, lead, warmup_seconds=0):
+        if upcoming is None:
+            return None, False
+        
+        fire_time, name = upcoming
+        if lead is None:
+            return fire_time, True
+        
+        max_lead = self.config.planner.get('max_lead_minutes', BatchPlanner.DEFAULT_MAX_LEAD_MINUTES)
+        earliest = fire_time - datetime.timedelta(minutes=max_lead)
+        window_start = earliest - datetime.timedelta(seconds=warmup_seconds)
+        if now < window_start:
+            return window_start, False
+        
+        try:
+            seconds = lead(name, fire_time)
+        except Exception as e:
+            logging.error(f"Could not plan {name} batch: {e}")
+            seconds = 0
+        return max(earliest, fire_time - datetime.timedelta(seconds=seconds)), True
+    
+    def _run_missed(self, callback):
+        now = datetime.datetime.now(pytz.utc)
+        grace = datetime.timedelta(hours=self.config.scheduler.get('missed_grace_hours', self.DEFAULT_MISSED_GRACE_HOURS))
+        missed = self.occurrences(max(self.last_fire, now - grace), now)
+        
+        if missed:
+            fire_time, name = missed[-1]
+            logging.info(f"Running missed {name} slot from {fire_time.astimezone(self.timezone())}")
+            self._fire(callback, name, fire_time)
+        else:
+            self.last_fire = now
+            self._save_state()
+    
+    def _warm_up(self, warmup, name, fire_time):
+        logging.info(f"Warming up {name} batch (slot {fire_time.astimezone(self.timezone())})")
+        try:
+            warmup(name, fire_time)
+        except Exception as e:
+            logging.error(f"Warm-up for {name} batch failed: {e}")
+        finally:
+            self.warmed_slot = fire_time
+    
+    def _fire(self, callback, name, fire_time):
+        logging.info(f"Scheduled {name} batch firing (slot {fire_time.astimezone(self.timezone())})")
+        try:
+            callback(name, fire_time)
+        except Exception as e:
+            logging.error(f"Scheduled {name} batch failed: {e}")
+        finally:
+            self.last_fire = fire_time
+            self._save_state()
+    
+    def reschedule(self):
+        self.wakeup.set()
+    
+    def stop(self):
+        self.running = False
+        self.wakeup.set()
+
+class BatchPlanner:
+    DEFAULT_SAFETY_FACTOR = 1.25
+    DEFAULT_MAX_LEAD_MINUTES = 120
+    DEFAULT_JOB_OVERHEAD = 15
+    DEFAULT_HISTORY_DAYS = 7
+    DEFAULT_PUBLISH_MARGIN_MINUTES = 15
+    MIN_HISTORY_UPLOADS = 3
+    
+    def __init__(self, config, tracker, estimator):
+        self.config = config
+        self.tracker = tracker
+        self.estimator = estimator
+    
+    @property
+    def enabled(self):
+        return self.config.planner.get('enabled', False)
+    
+    @property
+    def scheduled_publish(self):
+        return self.config.planner.get('scheduled_publish', False)
+    
+    def rate(self, platform):
+        days = self.config.planner.get('history_days', self.DEFAULT_HISTORY_DAYS)
+        measured = self.tracker.query(days=days, platform=platform)['platforms'].get(platform)
+        if measured and measured['uploads'] >= self.MIN_HISTORY_UPLOADS and measured['seconds'] > 0:
+            return measured['bytes'] / measured['seconds'], 0
+        return self.estimator(platform).estimate(), self.config.planner.get('job_overhead', self.DEFAULT_JOB_OVERHEAD)
+    
+    def _job(self, platform, size, uploader, rates):
+        if platform not in rates:
+            rates[platform] = self.rate(platform)
+        rate, overhead = rates[platform]
+        
+        readers = len(uploader.page_ids()) if isinstance(uploader, FacebookUploader) else 1
+        seconds = (size * readers / max(rate, 1.0) + overhead) * self.config.planner.get('safety_factor', self.DEFAULT_SAFETY_FACTOR)
+        
+        margin = 0
+        if self.scheduled_publish and uploader.MIN_SCHEDULE_LEAD is not None:
+            margin = max(uploader.MIN_SCHEDULE_LEAD, self.config.planner.get(
+                'publish_margin_minutes', self.DEFAULT_PUBLISH_MARGIN_MINUTES) * 60)
+        return platform, seconds, margin
+    
+    def plan(self, videos, slot_time, uploaders, now=None):
+        now = now or time.time()
+        slot = slot_time.timestamp()
+        rates = {}
+        
+        timings = []
+        for video_path, size, platforms in videos:
+            jobs = [self._job(platform, size, uploaders[platform], rates) for platform in platforms if platform in uploaders]
+            if jobs:
+                timings.append((video_path, jobs))
+        
+        if self.config.concurrency.get('enabled'):
+            duration = self._concurrent_seconds(timings)
+            margin = max([margin for _, jobs in timings for _, _, margin in jobs] or [0])
+            starts = [(video_path, slot - margin - duration, duration) for video_path, _ in timings]
+        else:
+            starts = self._sequential_starts(timings, slot)
+        
+        earliest = slot - self.config.planner.get('max_lead_minutes', self.DEFAULT_MAX_LEAD_MINUTES) * 60
+        plan = {'slot': slot, 'start': slot, 'finish': now, 'scheduled': self.scheduled_publish, 'videos': {}}
+        clock = now
+        for video_path, start, seconds in starts:
+            start = max(start, earliest)
+            if self.config.concurrency.get('enabled'):
+                finish = max(now, start) + seconds
+            else:
+                clock = finish = max(clock, start) + seconds
+            plan['videos'][video_path] = {'start': start, 'finish': finish}
+            plan['start'] = min(plan['start'], start)
+            plan['finish'] = max(plan['finish'], finish)
+        return plan
+    
+    def _sequential_starts(self, timings, slot):
+        starts = []
+        latest = slot
+        for video_path, jobs in reversed(timings):
+            seconds = sum(job[1] for job in jobs)
+            latest = min(latest, slot - max(job[2] for job in jobs)) - seconds
+            starts.append((video_path, latest, seconds))
+        return starts[::-1]
+    
+    def _concurrent_seconds(self, timings):
+        limits = self.config.concurrency.get('platform_limits', {})
+        lanes = {}
+        for _, jobs in timings:
+            for platform, seconds, _ in jobs:
+                lanes[platform] = lanes.get(platform, 0) + seconds
+        
+        total = sum(lanes.values()) / max(1, self.config.concurrency.get('max_workers', 4))
+        return max([total] + [seconds / max(1, limits.get(platform, 1)) for platform, seconds in lanes.items()])
+    
+    def lead(self, plan):
+        return max(0, plan['slot'] - plan['start'])
+
+class WorkerCoordinator:
+    DEFAULT_LEASE_TTL = 600
+    DEFAULT_TAKEOVER_DELAY = 300
+    
+    def __init__(self, config):
+        settings = config.workers
+        self.enabled = bool(settings.get('id'))
+        self.worker_id = settings.get('id') or f"{socket.gethostname()}-{os.getpid()}"
+        self.shards = max(1, int(settings.get('count', 1))) if self.enabled else 1
+        self.shard = int(settings.get('index', 0)) % self.shards
+        self.lease_ttl = settings.get('lease_ttl', self.DEFAULT_LEASE_TTL)
+        self.takeover_delay = settings.get('takeover_delay', self.DEFAULT_TAKEOVER_DELAY)
+        self.lease_dir = config.lease_dir
+        self.lock = threading.Lock()
+        self.held = {}
+        self.stopped = threading.Event()
+        self.renew_thread = None
+        
+        if self.enabled:
+            os.makedirs(os.path.join(self.lease_dir, 'slots'), exist_ok=True)
+            self.file_lock = FileLock(os.path.join(self.lease_dir, '.lock'))
+    
+    def _hash(self, text):
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+    
+    def _read(self, path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+    
+    def _write(self, path, record):
+        temp_file = f"{path}.{self.worker_id}.tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(record, f)
+        os.replace(temp_file, path)
+    
+    def owns(self, folder):
+        return int(self._hash(os.path.abspath(folder)), 16) % self.shards == self.shard
+    
+    def claim(self, folder, video_path):
+        if not self.enabled:
+            return True
+        
+        path = os.path.join(self.lease_dir, self._hash(f"{os.path.abspath(folder)}\0{video_path}") + '.json')
+        now = time.time()
+        with self.file_lock:
+            lease = self._read(path)
+            if lease and lease['worker'] != self.worker_id:
+                if lease['expires_at'] > now:
+                    return False
+                logging.info(f"Taking over expired lease on {video_path} from {lease['worker']}")
+            self._write(path, {
+                'folder': folder,
+                'video_path': video_path,
+                'worker': self.worker_id,
+                'expires_at': now + self.lease_ttl,
+            })
+        
+        with self.lock:
+            self.held[path] = video_path
+            if self.renew_thread is None:
+                self.renew_thread = threading.Thread(target=self._renew_loop, daemon=True, name='lease-renewal')
+                self.renew_thread.start()
+        return True
+    
+    def release(self, folder, video_path):
+        if not self.enabled:
+            return
+        
+        path = os.path.join(self.lease_dir, self._hash(f"{os.path.abspath(folder)}\0{video_path}") + '.json')
+        with self.lock:
+            self.held.pop(path, None)
+        with self.file_lock:
+            lease = self._read(path)
+            if lease and lease['worker'] == self.worker_id:
+                os.remove(path)
+    
+    def renew(self):
+        with self.lock:
+            held = dict(self.held)
+        
+        expires_at = time.time() + self.lease_ttl
+        with self.file_lock:
+            for path, video_path in held.items():
+                lease = self._read(path)
+                if lease is None or lease['worker'] != self.worker_id:
+                    logging.warning(f"Lost lease on {video_path}")
+                    with self.lock:
+                        self.held.pop(path, None)
+                    continue
+                lease['expires_at'] = expires_at
+                self._write(path, lease)
+    
+    def _renew_loop(self):
+        while not self.stopped.wait(self.lease_ttl / 3):
+            try:
+                self.renew()
+            except Exception as e:
+                logging.error(f"Lease renewal failed: {e}")
+    
+    def _slot_path(self, folder):
+        return os.path.join(self.lease_dir, 'slots', self._hash(os.path.abspath(folder)) + '.json')
+    
+    def claim_slot(self, folder, slot):
+        if not self.enabled or slot is None:
+            return True
+        
+        path = self._slot_path(folder)
+        with self.file_lock:
+            record = self._read(path)
+            if record and record['slot'] == slot and record['worker'] != self.worker_id:
+                return False
+            self._write(path, {'folder': folder, 'slot': slot, 'worker': self.worker_id, 'claimed_at': time.time()})
+        return True
+    
+    def slot_claimed(self, folder, slot):
+        record = self._read(self._slot_path(folder))
+        return record is not None and record['slot'] == slot
+    
+    def stop(self):
+        self.stopped.set()
+        with self.lock:
+            held = dict(self.held)
+        for path, video_path in held.items():
+            lease = self._read(path)
+            if lease:
+                self.release(lease['folder'], video_path)
+
+class PendingIndex:
+    POLICIES = ('oldest', 'name', 'smallest', 'round_robin')
+    DEFAULT_POLICY = 'oldest'
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.folders = {}
+        self.platforms = ()
+        self.policy = self.DEFAULT_POLICY
+        self.last_folder = None
+    
+    def configure(self, platforms, policy=None):
+        policy = policy or self.DEFAULT_POLICY
+        if policy not in self.POLICIES:
+            logging.warning(f"Unknown selection policy {policy}, using {self.DEFAULT_POLICY}")
+            policy = self.DEFAULT_POLICY
+        
+        with self.lock:
+            if tuple(platforms) != self.platforms or policy != self.policy:
+                self.platforms = tuple(platforms)
+                self.policy = policy
+                self.folders = {}
+    
+    def _key(self, entry):
+        if self.policy == 'name':
+            return (os.path.basename(entry.path).lower(), entry.path)
+        if self.policy == 'smallest':
+            return (entry.size, entry.path)
+        return (entry.mtime, entry.path)
+    
+    def sync(self, folder, cached, is_uploaded):
+        with self.lock:
+            state = self.folders.get(folder)
+            if cached is None:
+                self.folders.pop(folder, None)
+                return
+            if state is not None and state['source'] is cached:
+                return
+            if state is None:
+                state = self.folders[folder] = {'source': None, 'entries': {}, 'pending': {}, 'heap': []}
+            
+            old_entries = state['entries']
+            new_entries = cached['entries']
+            for path, entry in new_entries.items():
+                if old_entries.get(path) == entry:
+                    continue
+                platforms = set(platform for platform in self.platforms if not is_uploaded(path, platform))
+                if platforms:
+                    state['pending'][path] = platforms
+                    heapq.heappush(state['heap'], (self._key(entry), path))
+                else:
+                    state['pending'].pop(path, None)
+            
+            for path in old_entries.keys() - new_entries.keys():
+                state['pending'].pop(path, None)
+            
+            state['entries'] = new_entries
+            state['source'] = cached
+    
+    def has_pending(self, folder):
+        with self.lock:
+            state = self.folders.get(folder)
+            return bool(state and state['pending'])
+    
+    def pending_count(self, folder):
+        with self.lock:
+            state = self.folders.get(folder)
+            return len(state['pending']) if state else 0
+    
+    def peek(self, folder):
+        with self.lock:
+            state = self.folders.get(folder)
+            if state is None:
+                return None, None, None
+            
+            heap = state['heap']
+            while heap:
+                key, path = heap[0]
+                entry = state['entries'].get(path)
+                platforms = state['pending'].get(path)
+                if platforms is None or entry is None or self._key(entry) != key:
+                    heapq.heappop(heap)
+                    continue
+                return path, entry, set(platforms)
+            return None, None, None
+    
+    def select(self, folder, accept):
+        with self.lock:
+            state = self.folders.get(folder)
+            if state is None:
+                return None, None
+            
+            heap = state['heap']
+            skipped = []
+            selected = (None, None)
+            while heap:
+                key, path = heap[0]
+                entry = state['entries'].get(path)
+                platforms = state['pending'].get(path)
+                if platforms is None or entry is None or self._key(entry) != key:
+                    heapq.heappop(heap)
+                    continue
+                
+                platforms = accept(path, entry, platforms)
+                if platforms is None:
+                    skipped.append(heapq.heappop(heap))
+                    continue
+                if not platforms:
+                    del state['pending'][path]
+                    heapq.heappop(heap)
+                    continue
+                
+                state['pending'][path] = platforms
+                selected = (path, platforms)
+                break
+            
+            for item in skipped:
+                heapq.heappush(heap, item)
+            return selected
+    
+    def mark_uploaded(self, folder, path, platform):
+        with self.lock:
+            state = self.folders.get(folder)
+            platforms = state['pending'].get(path) if state else None
+            if platforms is None:
+                return
+            platforms.discard(platform)
+            if not platforms:
+                del state['pending'][path]
+    
+    def rotate(self, folders, peek=False):
+        if self.policy != 'round_robin':
+            return folders
         
-        raise Exception("YouTube upload requires google-api-python-client library")
+        with self.lock:
+            ordered = list(folders)
+            if self.last_folder in ordered:
+                start = ordered.index(self.last_folder) + 1
+                ordered = ordered[start:] + ordered[:start]
+            for folder in ordered:
+                state = self.folders.get(folder)
+                if state and state['pending']:
+                    if not peek:
+                        self.last_folder = folder
+                    return [folder]
+        return []
 
-class Statistics:
-    def __init__(self, config):
-        self.config = config
-        self.upload_history = self.load_history()
+class ProcessingPoller:
+    BATCH_SIZE = 50
+    MAX_SLEEP = 3600
+    DEFAULT_INTERVAL = 30
+    DEFAULT_MAX_INTERVAL = 900
+    DEFAULT_TIMEOUT_HOURS = 24
     
-    def load_history(self):
-        if os.path.exists(self.config.history_file):
-            try:
-                with open(self.config.history_file, 'r') as f:
-                    return json.load(f)
-            except:
-                return []
-        return []
+    def __init__(self, platform, settings, uploader, on_result):
+        self.platform = platform
+        self.settings = settings
+        self.uploader = uploader
+        self.on_result = on_result
+        self.lock = threading.Lock()
+        self.videos = {}
+        self.wakeup = threading.Event()
+        self.running = False
+        self.thread = None
     
-    def save_history(self):
-        with open(self.config.history_file, 'w') as f:
-            json.dump(self.upload_history, f, indent=2)
+    @property
+    def enabled(self):
+        return self.settings.get('enabled', True)
     
-    def is_uploaded(self, video_path, platform):
-        for entry in self.upload_history:
-            if entry['video_path'] == video_path and entry['platform'] == platform:
-                return True
-        return False
+    def add(self, video_path, folder, video_ids, uploaded_at=None):
+        with self.lock:
+            self.videos[video_path] = {
+                'folder': folder,
+                'pending': set(video_ids),
+                'failed': set(),
+                'error': None,
+                'uploaded_at': uploaded_at or time.time(),
+                'attempts': 0,
+                'next_check': time.time() + self.settings.get('interval', self.DEFAULT_INTERVAL),
+            }
+        self.wakeup.set()
     
-    def record_upload(self, video_path, platform, status='success'):
-        entry = {
-            'video_path': video_path,
-            'platform': platform,
-            'upload_date': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'status': status
-        }
-        self.upload_history.append(entry)
-        self.save_history()
+    def pending_count(self):
+        with self.lock:
+            return len(self.videos)
     
-    def get_stats(self):
-        stats = {'meta': 0, 'tiktok': 0, 'youtube': 0, 'total': 0}
+    def start(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._poll_loop, daemon=True, name=f"{self.platform}-processing")
+        self.thread.start()
+    
+    def stop(self):
+        self.running = False
+        self.wakeup.set()
+    
+    def join(self):
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+    
+    def _poll_loop(self):
+        while self.running:
+            with self.lock:
+                next_check = min((video['next_check'] for video in self.videos.values()), default=None)
+            timeout = self.MAX_SLEEP if next_check is None else min(next_check - time.time(), self.MAX_SLEEP)
+            
+            if timeout > 0 and self.wakeup.wait(timeout):
+                self.wakeup.clear()
+                continue
+            
+            if self.running:
+                try:
+                    self.poll()
+                except Exception as e:
+                    logging.error(f"{self.platform} processing status check failed: {e}")
+    
+    def poll(self, now=None):
+        now = now or time.time()
+        with self.lock:
+            due = [(video_path, video) for video_path, video in self.videos.items() if video['next_check'] <= now]
+        
+        uploader = self.uploader()
+        if not due or uploader is None:
+            return
         
-        for entry in self.upload_history:
-            platform = entry['platform']
-            if platform == 'facebook' or platform == 'instagram':
-                platform = 'meta'
+        checks = [(video_id, video_path) for video_path, video in due for video_id in sorted(video['pending'])]
+        for start in range(0, len(checks), self.BATCH_SIZE):
+            batch = checks[start:start + self.BATCH_SIZE]
+            try:
+                outcomes = uploader.check_processing([video_id for video_id, _ in batch])
+            except Exception as e:
+                logging.warning(f"{self.platform} processing status check for {len(batch)} video(s) failed: {e}")
+                continue
             
-            if platform in stats:
-                stats[platform] += 1
-            stats['total'] += 1
+            for video_id, video_path in batch:
+                if video_id in outcomes:
+                    self._resolve(video_path, video_id, *outcomes[video_id])
         
-        return stats
+        interval = self.settings.get('interval', self.DEFAULT_INTERVAL)
+        max_interval = self.settings.get('max_interval', self.DEFAULT_MAX_INTERVAL)
+        timeout = self.settings.get('timeout_hours', self.DEFAULT_TIMEOUT_HOURS) * 3600
+        expired = []
+        with self.lock:
+            for video_path, video in due:
+                if self.videos.get(video_path) is not video:
+                    continue
+                if now - video['uploaded_at'] >= timeout:
+                    expired.append((video_path, self.videos.pop(video_path)))
+                    continue
+                video['attempts'] += 1
+                video['next_check'] = time.time() + min(max_interval, interval * 2 ** video['attempts'])
+        
+        for video_path, video in expired:
+            if video['failed']:
+                self.on_result(video_path, video['folder'], 'failed', now - video['uploaded_at'], video['error'],
+                               sorted(video['failed']))
+            else:
+                self.on_result(video_path, video['folder'], 'timeout', now - video['uploaded_at'], "Still processing")
     
-    def clear_history(self):
-        self.upload_history = []
-        self.save_history()
+    def _resolve(self, video_path, video_id, outcome, error):
+        if outcome == 'processing':
+            return
+        
+        with self.lock:
+            video = self.videos.get(video_path)
+            if video is None:
+                return
+            video['pending'].discard(video_id)
+            if outcome != 'ready':
+                video['failed'].add(video_id)
+                video['error'] = error
+            if video['pending']:
+                return
+            del self.videos[video_path]
+        
+        if video['failed']:
+            self.on_result(video_path, video['folder'], 'failed', time.time() - video['uploaded_at'], video['error'],
+                           sorted(video['failed']))
+        else:
+            self.on_result(video_path, video['folder'], 'ready', time.time() - video['uploaded_at'], None)
 
 class VideoUploadManager:
     def __init__(self):
         self.config = Config()
+        self.process_lock = ProcessLock(self.config.process_lock_file)
+        self.process_lock.acquire()
         self.tracker = Statistics(self.config)
+        self.transfer_state = TransferStateStore(self.config.transfer_state_file)
+        self.credentials = CredentialManager()
+        self.scanner = FolderScanner(self.config)
+        self.scheduler = UploadScheduler(self.config, self.config.scheduler_state_file)
+        self.jobs = JobQueue(self.config.jobs_file, self.config.retry)
+        self.coordinator = WorkerCoordinator(self.config)
+        self.pending = PendingIndex()
+        self.planner = BatchPlanner(self.config, self.tracker, self.estimator)
+        self.warmed = {}
+        self.processing = ProcessingPoller(
+            'meta', self.config.processing, lambda: self.uploaders.get('meta'), self.record_processing
+        )
+        self.stopping = threading.Event()
+        self.batch_lock = threading.Lock()
+        self.retry_thread = None
+        self.governors = {}
+        self.estimators = {}
         self.uploaders = {}
         self.running = False
         
@@ -312,143 +4119,716 @@ class VideoUploadManager:
             format='%(asctime)s - %(levelname)s - %(message)s'
         )
         
+        METRICS.configure(self.config.metrics)
         self.init_uploaders()
     
     def init_uploaders(self):
+        for uploader in self.uploaders.values():
+            uploader.close()
         self.uploaders = {}
+        self.credentials.reset()
         
         if self.config.platforms.get('meta', {}).get('enabled'):
-            creds = self.config.platforms['meta']['credentials']
-            self.uploaders['meta'] = FacebookUploader(creds, self.config.testing_mode)
+            platform_config = self.config.platforms['meta']
+            self.uploaders['meta'] = FacebookUploader(
+                platform_config['credentials'], self.config.testing_mode,
+                options=platform_config, transfer_state=self.transfer_state,
+                credential_manager=self.credentials, http_options=self.config.http,
+                governor=self.governor('meta'), bandwidth=self.estimator('meta'),
+                transfer_options=self.config.transfers
+            )
         
         if self.config.platforms.get('tiktok', {}).get('enabled'):
-            creds = self.config.platforms['tiktok']['credentials']
-            self.uploaders['tiktok'] = TikTokUploader(creds, self.config.testing_mode)
+            platform_config = self.config.platforms['tiktok']
+            self.uploaders['tiktok'] = TikTokUploader(
+                platform_config['credentials'], self.config.testing_mode,
+                options=platform_config, transfer_state=self.transfer_state,
+                credential_manager=self.credentials, http_options=self.config.http,
+                governor=self.governor('tiktok'), bandwidth=self.estimator('tiktok'),
+                transfer_options=self.config.transfers
+            )
         
         if self.config.platforms.get('youtube', {}).get('enabled'):
-            creds = self.config.platforms['youtube']['credentials']
-            self.uploaders['youtube'] = YouTubeUploader(creds, self.config.testing_mode)
+            platform_config = self.config.platforms['youtube']
+            self.uploaders['youtube'] = YouTubeUploader(
+                platform_config['credentials'], self.config.testing_mode,
+                options=platform_config, transfer_state=self.transfer_state,
+                credential_manager=self.credentials, http_options=self.config.http,
+                governor=self.governor('youtube'), bandwidth=self.estimator('youtube'),
+                transfer_options=self.config.transfers
+            )
+        
+        for uploader in self.uploaders.values():
+            uploader.progress_callback = self.report_progress
+        self.pending.configure(list(self.uploaders), self.config.selection.get('policy'))
+    
+    def estimator(self, platform):
+        if platform not in self.estimators:
+            self.estimators[platform] = BandwidthEstimator(platform, self.config.transfers)
+        return self.estimators[platform]
+    
+    def report_progress(self, progress):
+        rate = progress.rate()
+        rate_text = f" at {rate / (1024*1024):.2f}MB/s" if rate else ""
+        logging.info(f"{progress.platform} {progress.video_file.filename}: {progress.fraction() * 100:.0f}%{rate_text}")
+    
+    def governor(self, platform):
+        if platform not in self.governors:
+            self.governors[platform] = RateGovernor(platform, self.config.rate_limits.get(platform), stopping=self.stopping)
+        return self.governors[platform]
     
     def get_videos_from_folders(self):
-        folder_videos = {}
+        with METRICS.stage('scan'):
+            return self.scanner.scan()
+    
+    def select_video(self, folder):
+        def accept(video_path, entry, platforms):
+            if not self.scanner.settled(video_path):
+                return None
+            
+            fingerprint = None
+            remaining = set()
+            for platform_name in platforms:
+                if self.tracker.is_uploaded(video_path, platform_name):
+                    continue
+                if self.jobs.state(video_path, platform_name) == 'failed':
+                    continue
+                if fingerprint is None:
+                    fingerprint = self.tracker.fingerprint(video_path, entry)
+                if not self.tracker.is_uploaded(video_path, platform_name, fingerprint):
+                    remaining.add(platform_name)
+            
+            if remaining and not self.coordinator.claim(folder, video_path):
+                return None
+            return remaining
         
-        for folder in self.config.folders:
-            if os.path.exists(folder):
-                videos = []
-                for file in os.listdir(folder):
-                    file_path = os.path.join(folder, file)
-                    if os.path.isfile(file_path):
-                        ext = os.path.splitext(file)[1].lower()
-                        if ext in ['.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm']:
-                            videos.append(file_path)
-                folder_videos[folder] = videos
+        return self.pending.select(folder, accept)
+    
+    def prepare_video(self, folder, video_path, plan=None):
+        filename = os.path.basename(video_path)
+        emit(f"\nFrom folder: {os.path.basename(folder)}")
+        emit(f"Video: {filename}")
         
-        return folder_videos
+        try:
+            video_file = self._warmed_video(video_path)
+            if video_file is None:
+                video_file = VideoFile(video_path)
+                video_file.fingerprint = self.tracker.fingerprint(video_path, self.scanner.entries(folder).get(video_path))
+            is_valid, validation_errors = video_file.validate()
+            
+            if not is_valid:
+                emit(f"  Validation failed")
+                return None
+            
+            emit(f"  Description: {video_file.name}")
+            if plan is not None and plan['scheduled']:
+                video_file.publish_at = plan['slot']
+            return video_file
+        
+        except Exception as e:
+            emit(f"  Error: {e}")
+            return None
+    
+    def run_job(self, job, video_file):
+        platform_name = job['platform']
+        uploader = self.uploaders.get(platform_name)
+        
+        if uploader is None:
+            emit(f"  {platform_name}: Not enabled")
+            self.jobs.fail(job, "Platform not enabled", transient=False)
+            return False
+        
+        emit(f"  Uploading to {platform_name}...")
+        
+        try:
+            if uploader.governor is not None and not uploader.testing_mode:
+                if not uploader.governor.acquire(uploader.UPLOAD_COST, timeout=uploader.governor.max_wait):
+                    wait = uploader.governor.wait_time(uploader.UPLOAD_COST)
+                    raise RateLimitedError(f"Rate limit reached, next upload in {wait / 60:.0f} min", wait)
+            
+            started = time.time()
+            with METRICS.stage('upload', platform_name) as stage:
+                if job.get('pages'):
+                    success = uploader.upload(video_file, page_ids=job['pages'])
+                else:
+                    success = uploader.upload(video_file)
+                if success:
+                    stage.set(bytes_sent=video_file.size)
+                else:
+                    stage.set(outcome='failed')
+            
+            if success:
+                video_ids = video_file.remote_ids.get(platform_name)
+                pages = video_file.remote_pages.get(platform_name)
+                polled = platform_name == self.processing.platform and bool(video_ids) and self.processing.enabled
+                previous = self.tracker.history.get(video_file.path, platform_name)
+                reuploads = previous.get('reuploads', 0) + 1 if previous and previous.get('reupload') else None
+                
+                recorded_ids, recorded_pages = video_ids, pages
+                if job.get('pages') and previous and previous.get('pages'):
+                    kept = {video_id: page_id for video_id, page_id in previous['pages'].items() if page_id not in job['pages']}
+                    recorded_ids = list(kept) + list(video_ids or [])
+                    recorded_pages = dict(kept, **(pages or {}))
+                
+                self.tracker.record_upload(
+                    video_file.path, platform_name, 'success', video_file.fingerprint,
+                    folder=job['folder'], bytes_sent=video_file.size, duration=time.time() - started,
+                    video_ids=recorded_ids, processing='pending' if polled else None, reuploads=reuploads,
+                    pages=recorded_pages
+                )
+                if polled:
+                    self.processing.add(video_file.path, job['folder'], video_ids)
+                self.jobs.complete(job)
+                self.pending.mark_uploaded(job['folder'], video_file.path, platform_name)
+                emit(f"  {platform_name}: Success")
+                return True
+            
+            error = TransientUploadError("Upload returned failure")
+            emit(f"  {platform_name}: Failed")
+        
+        except Exception as e:
+            error = e
+            emit(f"  {platform_name}: {str(e)}")
+        finally:
+            video_file.release(platform_name)
+        
+        if isinstance(error, RateLimitedError):
+            self.jobs.defer(job, error.wait)
+            retry_at = datetime.datetime.fromtimestamp(time.time() + error.wait).strftime('%H:%M:%S')
+            emit(f"  {platform_name}: Deferred until {retry_at}")
+            return False
+        
+        self.tracker.record_failure(video_file.path, platform_name, job['folder'])
+        job = self.jobs.fail(job, error, is_transient_error(error))
+        if job['state'] == 'retry':
+            retry_at = datetime.datetime.fromtimestamp(job['next_attempt']).strftime('%H:%M:%S')
+            emit(f"  {platform_name}: Retry {job['attempts']} scheduled for {retry_at}")
+        return False
     
-    def upload_batch(self, batch_type="scheduled"):
+    def upload_batch(self, batch_type="scheduled", slot_time=None):
         print(f"\nStarting {batch_type} upload batch...")
         
         if not self.uploaders:
             print("No platforms enabled!")
             return
         
-        folder_videos = self.get_videos_from_folders()
+        slot = slot_time.isoformat() if slot_time is not None else None
+        with self.batch_lock:
+            self.tracker.refresh()
+            folder_videos = self.get_videos_from_folders()
+            foreign = {folder: videos for folder, videos in folder_videos.items() if not self.coordinator.owns(folder)}
+            
+            self._enqueue_folders({folder: videos for folder, videos in folder_videos.items() if folder not in foreign}, slot)
+            jobs = self.jobs.claim_due()
+            successes = self._run_jobs(jobs, slot_time) if jobs else []
+            
+            taken = []
+            if foreign and slot is not None and self.coordinator.enabled:
+                taken = self._take_over(foreign, slot, slot_time)
+                successes.extend(self._run_jobs(taken, slot_time) if taken else [])
+            self.warmed = {}
+            
+            if not jobs and not taken:
+                print("No videos found")
+                return
+        
+        upload_count = len(successes)
+        successful_platforms = set(platform for _, platform in successes)
         
-        if not folder_videos:
-            print("No videos found")
-            return
+        if successful_platforms:
+            platform_map = {'meta': 'Meta', 'tiktok': 'TikTok', 'youtube': 'YouTube'}
+            display_names = set()
+            for platform in successful_platforms:
+                display_names.add(platform_map.get(platform, platform))
+            
+            platforms_text = ', '.join(sorted(display_names))
+            print(f"\nSuccessfully uploaded to {platforms_text}. Done")
         
-        upload_count = 0
-        successful_platforms = set()
+        print(f"\nBatch complete. Uploaded: {upload_count}")
+    
+    def _enqueue_folders(self, folder_videos, slot):
+        for folder in folder_videos:
+            self.pending.sync(folder, self.scanner.cached(folder), self.tracker.is_uploaded)
         
-        for folder, videos in folder_videos.items():
-            if not videos:
+        for folder in self.pending.rotate(list(folder_videos)):
+            if not self.pending.has_pending(folder) or not self.coordinator.claim_slot(folder, slot):
                 continue
+            video_path, platforms = self.select_video(folder)
+            if video_path is None:
+                continue
+            for platform_name in self.uploaders:
+                if platform_name in platforms:
+                    self.jobs.enqueue(video_path, folder, platform_name)
+    
+    def _take_over(self, foreign, slot, slot_time):
+        delay = slot_time.timestamp() + self.coordinator.takeover_delay - time.time()
+        if delay > 0 and self.stopping.wait(delay):
+            return []
+        
+        orphaned = {folder: videos for folder, videos in foreign.items() if not self.coordinator.slot_claimed(folder, slot)}
+        if not orphaned:
+            return []
+        
+        print(f"\nTaking over {len(orphaned)} folder(s) not claimed by their worker...")
+        self.tracker.refresh()
+        self._enqueue_folders(orphaned, slot)
+        return self.jobs.claim_due()
+    
+    def _warmed_video(self, video_path):
+        warmed = self.warmed.pop(video_path, None)
+        if warmed is None:
+            return None
+        
+        video_file, stamp = warmed
+        try:
+            stat = os.stat(video_path)
+        except OSError:
+            return None
+        return video_file if (stat.st_size, stat.st_mtime_ns) == stamp else None
+    
+    def _candidates(self):
+        with self.batch_lock:
+            self.tracker.refresh()
+            folder_videos = self.get_videos_from_folders()
+            owned = [folder for folder in folder_videos if self.coordinator.owns(folder)]
+            for folder in owned:
+                self.pending.sync(folder, self.scanner.cached(folder), self.tracker.is_uploaded)
             
-            video_to_upload = None
-            
-            for video_path in videos:
-                uploaded_to_all = True
-                for platform_name in self.uploaders.keys():
-                    if not self.tracker.is_uploaded(video_path, platform_name):
-                        uploaded_to_all = False
-                        break
+            candidates = []
+            for folder in self.pending.rotate(owned, peek=True):
+                video_path, entry, platforms = self.pending.peek(folder)
+                if video_path is not None:
+                    candidates.append((folder, video_path, entry, [name for name in self.uploaders if name in platforms]))
+            return candidates
+    
+    def plan_batch(self, slot_time):
+        videos = [(video_path, entry.size, platforms) for _, video_path, entry, platforms in self._candidates()]
+        return self.planner.plan(videos, slot_time, self.uploaders)
+    
+    def warm_up(self, name, slot_time):
+        if not self.uploaders:
+            return
+        
+        started = time.time()
+        prefetch_bytes = int(self.config.scheduler.get('warmup_prefetch_mb', 256) * 1024 * 1024)
+        warmed = {}
+        problems = []
+        
+        for folder, video_path, entry, platforms in self._candidates():
+            if not self.scanner.settled(video_path):
+                problems.append(f"{os.path.basename(video_path)}: still being written")
+                continue
+            try:
+                stat = os.stat(video_path)
+                video_file = VideoFile(video_path)
+                video_file.fingerprint = self.tracker.fingerprint(video_path, entry)
                 
-                if not uploaded_to_all:
-                    video_to_upload = video_path
-                    break
+                errors = video_file.validate()[1]
+                for platform_name in platforms:
+                    errors.extend(
+                        f"{platform_name}: {error}"
+                        for error in video_file.validate(platform_name, self.uploaders[platform_name].options.get('limits'))[1]
+                    )
+                if errors:
+                    problems.append(f"{video_file.filename}: {', '.join(errors)}")
+                    continue
+                
+                if prefetch_bytes > 0:
+                    video_file.prefetch(prefetch_bytes)
+                warmed[video_path] = (video_file, (stat.st_size, stat.st_mtime_ns))
+            except OSError as e:
+                problems.append(f"{os.path.basename(video_path)}: {e}")
+        
+        for platform_name, uploader in self.uploaders.items():
+            if uploader.testing_mode:
+                continue
+            if uploader.governor is not None and uploader.governor.paused():
+                logging.info(f"Warm-up for {name} batch: {platform_name} is paused by its rate limit, skipping")
+                continue
+            try:
+                is_valid, message = self.credentials.refresh(platform_name, uploader)
+                if not is_valid:
+                    problems.append(f"{platform_name} credentials: {message}")
+                    continue
+            except Exception as e:
+                problems.append(f"{platform_name} credentials: {e}")
+                continue
+            uploader.preconnect()
+        
+        self.warmed = warmed
+        for problem in problems:
+            logging.warning(f"Warm-up for {name} batch: {problem}")
+        print(f"\nWarm-up for {name} batch: {len(warmed)} video(s) ready, {len(problems)} problem(s) "
+              f"({time.time() - started:.1f}s)")
+    
+    def batch_lead(self, name, slot_time):
+        if not self.planner.enabled or not self.uploaders:
+            return 0
+        
+        plan = self.plan_batch(slot_time)
+        lead = self.planner.lead(plan)
+        if plan['videos']:
+            start = datetime.datetime.fromtimestamp(plan['start']).strftime('%H:%M:%S')
+            logging.info(
+                f"Planned {name} batch: {len(plan['videos'])} video(s), starting {start} "
+                f"({lead / 60:.1f} min before the slot)"
+            )
+        return lead
+    
+    def retry_jobs(self):
+        with self.batch_lock:
+            self.tracker.refresh()
+            jobs = self.jobs.claim_due()
+            if not jobs:
+                return
             
-            if video_to_upload is None:
-                video_to_upload = videos[0]
+            print(f"\nRetrying {len(jobs)} queued upload(s)...")
+            successes = self._run_jobs(jobs)
+        
+        print(f"\nRetry complete. Uploaded: {len(successes)}")
+    
+    def run_retries(self):
+        while self.running:
+            due_at = self.jobs.next_due()
+            timeout = self.scheduler.MAX_SLEEP if due_at is None else min(due_at - time.time(), self.scheduler.MAX_SLEEP)
             
-            filename = os.path.basename(video_to_upload)
-            print(f"\nFrom folder: {os.path.basename(folder)}")
-            print(f"Video: {filename}")
+            if timeout > 0 and self.jobs.wakeup.wait(timeout):
+                self.jobs.wakeup.clear()
+                continue
             
-            try:
-                video_file = VideoFile(video_to_upload)
-                is_valid, validation_errors = video_file.validate()
-                
-                if not is_valid:
-                    print(f"  Validation failed")
+            due_at = self.jobs.next_due()
+            if self.running and due_at is not None and due_at <= time.time():
+                try:
+                    self.retry_jobs()
+                except Exception as e:
+                    logging.error(f"Retry run failed: {e}")
+    
+    def _run_jobs(self, jobs, slot_time=None):
+        groups = collections.OrderedDict()
+        for job in jobs:
+            groups.setdefault(job['video_path'], (job['folder'], []))[1].append(job)
+        
+        for video_path, (folder, video_jobs) in list(groups.items()):
+            if not self.coordinator.claim(folder, video_path):
+                emit(f"\n{os.path.basename(video_path)}: claimed by another worker, deferring")
+                for job in video_jobs:
+                    self.jobs.defer(job, self.coordinator.lease_ttl)
+                del groups[video_path]
+        
+        plan = None
+        if slot_time is not None and self.planner.enabled:
+            sizes = {}
+            for video_path in groups:
+                try:
+                    sizes[video_path] = os.path.getsize(video_path)
+                except OSError:
+                    sizes[video_path] = 0
+            videos = [(video_path, sizes[video_path], [job['platform'] for job in video_jobs])
+                      for video_path, (_, video_jobs) in groups.items()]
+            plan = self.planner.plan(videos, slot_time, self.uploaders)
+        
+        try:
+            if self.config.concurrency.get('enabled'):
+                successes = self._run_concurrent(groups, plan)
+            else:
+                successes = self._run_sequential(groups, plan)
+        finally:
+            for video_path, (folder, _) in groups.items():
+                self.coordinator.release(folder, video_path)
+        
+        if plan is not None and plan['videos']:
+            self._log_plan_result('Batch', plan['finish'], time.time(), plan['slot'])
+        
+        if self.tracker.fingerprinter is not None:
+            self.tracker.fingerprinter.save()
+        METRICS.export()
+        return successes
+    
+    def _run_sequential(self, groups, plan=None):
+        fanout_window = int(self.config.concurrency.get('fanout_window_mb', SharedReadBuffer.DEFAULT_WINDOW_MB) * 1024 * 1024)
+        successes = []
+        
+        for video_path, (folder, video_jobs) in groups.items():
+            if self.stopping.is_set():
+                self._defer_unstarted(video_jobs)
+                continue
+            
+            planned = plan['videos'].get(video_path) if plan is not None else None
+            if planned is not None and planned['start'] > time.time():
+                emit(f"\nWaiting until {datetime.datetime.fromtimestamp(planned['start']).strftime('%H:%M:%S')} "
+                     f"to start {os.path.basename(video_path)}")
+                if self.stopping.wait(planned['start'] - time.time()):
+                    self._defer_unstarted(video_jobs)
                     continue
-                
-                print(f"  Description: {video_file.name}")
             
-            except Exception as e:
-                print(f"  Error: {e}")
+            video_file = self.prepare_video(folder, video_path, plan)
+            if video_file is None:
+                for job in video_jobs:
+                    self.tracker.record_failure(job['video_path'], job['platform'], job['folder'])
+                    self.jobs.fail(job, "Validation failed", transient=False)
                 continue
             
-            for platform_name, uploader in self.uploaders.items():
-                if self.tracker.is_uploaded(video_to_upload, platform_name):
-                    print(f"  {platform_name}: Already uploaded")
+            for job in video_jobs:
+                platform_name = job['platform']
+                if self.stopping.is_set():
+                    self._defer_unstarted([job])
+                    continue
+                if self.tracker.is_uploaded(video_file.path, platform_name, video_file.fingerprint):
+                    emit(f"  {platform_name}: Already uploaded")
+                    self.jobs.complete(job)
+                    self.pending.mark_uploaded(folder, video_file.path, platform_name)
                     continue
                 
-                print(f"  Uploading to {platform_name}...")
+                if self._fanout_readers([job]) > 1:
+                    video_file.share(fanout_window, self.config.concurrency.get('fanout_max_lag'))
+                try:
+                    if self.run_job(job, video_file):
+                        successes.append((video_file.path, platform_name))
+                finally:
+                    video_file.close()
+            
+            if planned is not None:
+                self._log_plan_result(video_file.filename, planned['finish'], time.time(), plan['slot'])
+        
+        return successes
+    
+    def _defer_unstarted(self, jobs):
+        for job in jobs:
+            self.jobs.defer(job, 0)
+        if jobs:
+            logging.info(f"Stopping: left {len(jobs)} upload job(s) queued for the next run")
+    
+    def _log_plan_result(self, label, planned, actual, slot):
+        def clock(timestamp):
+            return datetime.datetime.fromtimestamp(timestamp).strftime('%H:%M:%S')
+        
+        logging.info(
+            f"{label}: planned finish {clock(planned)}, actual {clock(actual)} "
+            f"({actual - planned:+.0f}s, {slot - actual:.0f}s before the {clock(slot)} slot)"
+        )
+    
+    def _run_concurrent(self, groups, plan=None):
+        max_workers = self.config.concurrency.get('max_workers', 4)
+        platform_limits = self.config.concurrency.get('platform_limits', {})
+        
+        slots = {}
+        for job in itertools.chain.from_iterable(video_jobs for _, video_jobs in groups.values()):
+            if job['platform'] not in slots:
+                slots[job['platform']] = threading.BoundedSemaphore(platform_limits.get(job['platform'], 1))
+        
+        def upload_task(job, video_file):
+            _output.buffer = []
+            try:
+                with slots[job['platform']]:
+                    if self.stopping.is_set():
+                        self._defer_unstarted([job])
+                        emit(f"  {job['platform']}: Left queued (stopping)")
+                        return False, _output.buffer
+                    success = self.run_job(job, video_file)
+                return success, _output.buffer
+            finally:
+                _output.buffer = None
+        
+        fanout_window = int(self.config.concurrency.get('fanout_window_mb', SharedReadBuffer.DEFAULT_WINDOW_MB) * 1024 * 1024)
+        successes = []
+        pending = {}
+        blocks = {}
+        futures = {}
+        video_files = {}
+        
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='upload') as executor:
+            for video_path, (folder, video_jobs) in groups.items():
+                if self.stopping.is_set():
+                    self._defer_unstarted(video_jobs)
+                    continue
                 
+                _output.buffer = []
                 try:
-                    success = uploader.upload(video_file)
-                    
-                    if success:
-                        self.tracker.record_upload(video_to_upload, platform_name, 'success')
-                        upload_count += 1
-                        successful_platforms.add(platform_name)
-                        print(f"  {platform_name}: Success")
-                    else:
-                        print(f"  {platform_name}: Failed")
+                    video_file = self.prepare_video(folder, video_path, plan)
+                    header = _output.buffer
+                finally:
+                    _output.buffer = None
                 
+                if video_file is None:
+                    for job in video_jobs:
+                        self.tracker.record_failure(job['video_path'], job['platform'], job['folder'])
+                        self.jobs.fail(job, "Validation failed", transient=False)
+                    print('\n'.join(header))
+                    continue
+                
+                blocks[video_path] = (header, {})
+                upload_jobs = []
+                for job in video_jobs:
+                    platform_name = job['platform']
+                    if self.tracker.is_uploaded(video_path, platform_name, video_file.fingerprint):
+                        blocks[video_path][1][platform_name] = [f"  {platform_name}: Already uploaded"]
+                        self.jobs.complete(job)
+                        self.pending.mark_uploaded(folder, video_path, platform_name)
+                        continue
+                    upload_jobs.append(job)
+                
+                if self._fanout_readers(upload_jobs) > 1:
+                    video_files[video_path] = video_file
+                    video_file.share(fanout_window, self.config.concurrency.get('fanout_max_lag'))
+                
+                pending[video_path] = len(upload_jobs)
+                for job in upload_jobs:
+                    future = executor.submit(upload_task, job, video_file)
+                    futures[future] = (video_path, job['platform'])
+                
+                if pending[video_path] == 0:
+                    self._print_video_block(*blocks.pop(video_path))
+            
+            for future in concurrent.futures.as_completed(futures):
+                video_path, platform_name = futures[future]
+                try:
+                    success, lines = future.result()
                 except Exception as e:
-                    print(f"  {platform_name}: {str(e)}")
+                    success, lines = False, [f"  {platform_name}: {str(e)}"]
+                
+                blocks[video_path][1][platform_name] = lines
+                if success:
+                    successes.append((video_path, platform_name))
                 
-                time.sleep(5)
+                pending[video_path] -= 1
+                if pending[video_path] == 0:
+                    if video_path in video_files:
+                        video_files.pop(video_path).close()
+                    self._print_video_block(*blocks.pop(video_path))
         
-        if successful_platforms:
-            platform_map = {'meta': 'Meta', 'tiktok': 'TikTok', 'youtube': 'YouTube'}
-            display_names = set()
-            for platform in successful_platforms:
-                display_names.add(platform_map.get(platform, platform))
-            
-            platforms_text = ', '.join(sorted(display_names))
-            print(f"\nSuccessfully uploaded to {platforms_text}. Done")
+        return successes
+    
+    def _fanout_readers(self, jobs):
+        if not self.config.concurrency.get('fanout', True) or self.config.testing_mode:
+            return 0
         
-        print(f"\nBatch complete. Uploaded: {upload_count}")
+        readers = 0
+        for job in jobs:
+            uploader = self.uploaders.get(job['platform'])
+            if isinstance(uploader, FacebookUploader):
+                readers += len(uploader.page_ids())
+            elif uploader is not None:
+                readers += 1
+        return readers
+    
+    def record_processing(self, video_path, folder, outcome, seconds, error=None, failed_ids=None):
+        platform_name = self.processing.platform
+        filename = os.path.basename(video_path)
+        
+        reupload = False
+        pages = None
+        if outcome == 'failed':
+            entry = self.tracker.history.get(video_path, platform_name) or {}
+            reupload = (self.config.processing.get('reupload', True)
+                        and entry.get('reuploads', 0) < self.config.processing.get('max_reuploads', 2))
+            video_pages = entry.get('pages') or {}
+            if failed_ids and all(video_id in video_pages for video_id in failed_ids):
+                pages = sorted({video_pages[video_id] for video_id in failed_ids})
+        self.tracker.record_processing(video_path, platform_name, outcome, seconds, error, reupload)
+        
+        if outcome == 'ready':
+            logging.info(f"{platform_name} finished processing {filename} in {seconds:.0f}s")
+        elif outcome == 'timeout':
+            logging.warning(f"{platform_name} still processing {filename} after {seconds / 3600:.1f}h, no longer checking")
+        elif reupload:
+            target = f" to page(s) {', '.join(pages)}" if pages else ""
+            logging.warning(f"{platform_name} processing of {filename} failed ({error}), queued for re-upload{target}")
+            self.jobs.enqueue(video_path, folder, platform_name, pages=pages)
+            self.jobs.wakeup.set()
+        else:
+            logging.error(f"{platform_name} processing of {filename} failed ({error}), not re-uploading again")
+    
+    def _watch_processing(self):
+        platform_name = self.processing.platform
+        for entry in self.tracker.history.entries():
+            folder = os.path.dirname(entry['video_path'])
+            if (entry['platform'] != platform_name or entry.get('processing') != 'pending'
+                    or not entry.get('video_ids') or not self.coordinator.owns(folder)):
+                continue
+            try:
+                uploaded_at = datetime.datetime.strptime(entry['upload_date'], '%Y-%m-%d %H:%M:%S').timestamp()
+            except (KeyError, ValueError):
+                uploaded_at = None
+            self.processing.add(entry['video_path'], folder, entry['video_ids'], uploaded_at)
+        self.processing.start()
+    
+    def _print_video_block(self, header, platform_lines):
+        order = list(self.uploaders)
+        lines = list(header)
+        for platform_name in sorted(platform_lines, key=lambda name: order.index(name) if name in order else len(order)):
+            lines.extend(platform_lines[platform_name])
+        print('\n'.join(lines))
     
     def run_scheduler(self):
         self.running = True
-        schedule.clear()
+        self.stopping.clear()
+        self.scanner.start_watching()
+        self.retry_thread = threading.Thread(target=self.run_retries, daemon=True, name='upload-retries')
+        self.retry_thread.start()
+        if self.processing.enabled:
+            self._watch_processing()
         
-        schedule.every().day.at(self.config.morning_time).do(self.upload_batch, "morning")
-        schedule.every().day.at(self.config.night_time).do(self.upload_batch, "night")
+        slot_times = ', '.join(slot_time.strftime('%H:%M') for _, slot_time in self.scheduler.slots())
+        print(f"Scheduler running. Uploads at {slot_times} ({self.config.timezone})")
         
-        print(f"Scheduler running. Uploads at {self.config.morning_time} and {self.config.night_time}")
-        
-        while self.running:
-            schedule.run_pending()
-            time.sleep(60)
+        self.scheduler.run(self.upload_batch, lead=self.batch_lead, warmup=self.warm_up)
     
     def stop_scheduler(self):
         self.running = False
-        schedule.clear()
+        self.stopping.set()
+        self.scheduler.stop()
+        self.scanner.stop_watching()
+        self.processing.stop()
+        self.jobs.wakeup.set()
+        for governor in self.governors.values():
+            governor.wake()
+    
+    def reschedule(self):
+        self.scheduler.reschedule()
+    
+    def reload_config(self):
+        with self.batch_lock:
+            self.config.load_config()
+            METRICS.configure(self.config.metrics)
+            self.tracker.configure()
+            self.jobs.settings = self.config.retry
+            self.processing.settings = self.config.processing
+            for platform, governor in self.governors.items():
+                governor.configure(self.config.rate_limits.get(platform))
+            for estimator in self.estimators.values():
+                estimator.configure(self.config.transfers)
+            self.init_uploaders()
+        self.scanner.notify()
+        self.reschedule()
+        logging.info("Configuration reloaded")
+    
+    def drain(self):
+        self.stop_scheduler()
+        with self.batch_lock:
+            pass
+        if self.retry_thread is not None:
+            self.retry_thread.join()
+        self.processing.join()
+        
+        for uploader in self.uploaders.values():
+            uploader.close()
+        self.credentials.stop()
+        self.coordinator.stop()
+        self.tracker.history.close()
+        self.tracker.rollup.close()
+        METRICS.export()
+        self.process_lock.release()
+
+def print_stats_report(title, report):
+    print(f"\n{title}:")
+    print(f"  {'platform':<10} {'uploads':>8} {'failed':>8} {'MB':>10} {'Mbit/s':>8}")
+    rows = list(report['platforms'].items()) + [('total', report['total'])]
+    for name, counters in rows:
+        throughput = counters['throughput_mbps']
+        print(
+            f"  {name:<10} {counters['uploads']:>8} {counters['failures']:>8} "
+            f"{counters['bytes'] / (1024*1024):>10.1f} {throughput if throughput is not None else '-':>8}"
+        )
 
 class CLI:
     def __init__(self):
@@ -495,6 +4875,7 @@ class CLI:
                 print(f"TikTok: {stats['tiktok']}")
                 print(f"YouTube: {stats['youtube']}")
                 print(f"Total: {stats['total']}")
+                print_stats_report("Last 7 days", self.manager.tracker.query(days=7))
                 input("\nPress Enter...")
             elif choice == '8':
                 self.manager.config.testing_mode = not self.manager.config.testing_mode
@@ -524,6 +4905,7 @@ class CLI:
                 if os.path.exists(folder):
                     self.manager.config.folders.append(folder)
                     self.manager.config.save_config()
+                    self.manager.scanner.notify()
                     print("Added!")
                 else:
                     print("Folder not found!")
@@ -534,6 +4916,7 @@ class CLI:
                     if 0 <= idx < len(self.manager.config.folders):
                         self.manager.config.folders.pop(idx)
                         self.manager.config.save_config()
+                        self.manager.scanner.notify()
                         print("Removed!")
                     input("\nPress Enter...")
                 except:
@@ -602,7 +4985,169 @@ class CLI:
         print("Configured!")
         input("\nPress Enter...")
 
-def main():
+class HeadlessCLI:
+    def __init__(self, args):
+        self.args = args
+        self.config = Config()
+    
+    def enabled_platforms(self):
+        if getattr(self.args, 'platform', None):
+            return [self.args.platform]
+        return [name for name, settings in self.config.platforms.items() if settings.get('enabled')]
+    
+    def print_json(self, data):
+        print(json.dumps(data, indent=2, ensure_ascii=False))
+    
+    def history(self):
+        return HistoryStore(self.config.history_journal, legacy_file=self.config.history_file)
+    
+    def stats(self):
+        rollup = StatsRollup(self.config.stats_file)
+        if not rollup.loaded:
+            rollup.rebuild(self.history().entries())
+        stats = rollup.counts()
+        report = rollup.query(days=self.args.days, platform=self.args.platform, folder=self.args.folder)
+        
+        if self.args.json:
+            self.print_json(dict(report, counts=stats))
+        else:
+            print(f"Meta: {stats['meta']}")
+            print(f"TikTok: {stats['tiktok']}")
+            print(f"YouTube: {stats['youtube']}")
+            print(f"Total: {stats['total']}")
+            print_stats_report(f"Last {self.args.days} days" if self.args.days else "All time", report)
+        return 0
+    
+    def scan(self):
+        history = self.history()
+        platforms = self.enabled_platforms()
+        folder_videos = FolderScanner(self.config).scan()
+        
+        result = {}
+        for folder, videos in folder_videos.items():
+            pending = {
+                platform: [video for video in videos if not history.contains(video, platform)]
+                for platform in platforms
+            }
+            result[folder] = {'videos': videos, 'pending': pending}
+        
+        if self.args.json:
+            self.print_json(result)
+        else:
+            for folder, info in result.items():
+                print(f"{folder}: {len(info['videos'])} video(s)")
+                for platform, pending in info['pending'].items():
+                    print(f"  {platform}: {len(pending)} pending")
+        return 0
+    
+    def validate(self):
+        paths = self.args.paths
+        if not paths:
+            paths = [video for videos in FolderScanner(self.config).scan().values() for video in videos]
+        platforms = self.enabled_platforms() or [None]
+        
+        result = {}
+        for path in paths:
+            result[path] = {}
+            try:
+                video_file = VideoFile(path)
+                for platform in platforms:
+                    limits = self.config.platforms.get(platform, {}).get('limits')
+                    is_valid, errors = video_file.validate(platform, limits)
+                    result[path][platform or 'any'] = errors
+            except OSError as e:
+                error = e.strerror or str(e)
+                result[path] = {platform or 'any': [f"Cannot read file: {error}"] for platform in platforms}
+        
+        failed = any(errors for checks in result.values() for errors in checks.values())
+        if self.args.json:
+            self.print_json(result)
+        else:
+            for path, checks in result.items():
+                for platform, errors in checks.items():
+                    status = "OK" if not errors else "; ".join(errors)
+                    print(f"{path} [{platform}]: {status}")
+        return 1 if failed else 0
+    
+    def upload_now(self):
+        manager = VideoUploadManager()
+        try:
+            manager.upload_batch(self.args.batch_type)
+        finally:
+            manager.drain()
+        return 0
+    
+    def daemon(self):
+        manager = VideoUploadManager()
+        stopping = threading.Event()
+        reloading = threading.Event()
+        
+        def handle_stop(signum, frame):
+            logging.info(f"Received signal {signum}, draining uploads")
+            stopping.set()
+        
+        def handle_reload(signum, frame):
+            reloading.set()
+        
+        signal.signal(signal.SIGTERM, handle_stop)
+        signal.signal(signal.SIGINT, handle_stop)
+        if hasattr(signal, 'SIGHUP'):
+            signal.signal(signal.SIGHUP, handle_reload)
+        
+        scheduler_thread = threading.Thread(target=manager.run_scheduler, name='upload-scheduler')
+        scheduler_thread.start()
+        
+        while scheduler_thread.is_alive() and not stopping.is_set():
+            scheduler_thread.join(1)
+            if reloading.is_set():
+                reloading.clear()
+                print("Reloading configuration...")
+                manager.reload_config()
+        
+        print("Stopping: waiting for in-flight uploads...")
+        manager.drain()
+        scheduler_thread.join()
+        print("Stopped.")
+        return 0
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Upload videos to Meta, TikTok and YouTube")
+    commands = parser.add_subparsers(dest='command')
+    
+    upload_parser = commands.add_parser('upload-now', help='run one upload batch and exit')
+    upload_parser.add_argument('--batch-type', default='manual')
+    commands.add_parser('daemon', help='run the scheduler in the foreground (SIGTERM drains, SIGHUP reloads config)')
+    
+    stats_parser = commands.add_parser('stats', help='print upload counts and rollups')
+    stats_parser.add_argument('--days', type=int, help='only the last N days')
+    stats_parser.add_argument('--platform', choices=['meta', 'tiktok', 'youtube'])
+    stats_parser.add_argument('--folder', help='only uploads from this folder')
+    stats_parser.add_argument('--json', action='store_true')
+    
+    scan_parser = commands.add_parser('scan', help='list videos and pending uploads per folder')
+    scan_parser.add_argument('--platform', choices=['meta', 'tiktok', 'youtube'])
+    scan_parser.add_argument('--json', action='store_true')
+    
+    validate_parser = commands.add_parser('validate', help='check videos against platform limits')
+    validate_parser.add_argument('paths', nargs='*', help='video files (default: every video in the configured folders)')
+    validate_parser.add_argument('--platform', choices=['meta', 'tiktok', 'youtube'])
+    validate_parser.add_argument('--json', action='store_true')
+    
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    
+    if args.command is not None:
+        handler = getattr(HeadlessCLI(args), args.command.replace('-', '_'))
+        try:
+            return handler()
+        except ProcessLockError as e:
+            print(f"Error: {e}")
+            return 1
+        except KeyboardInterrupt:
+            return 130
+    
     try:
         cli = CLI()
         cli.run()
@@ -610,6 +5155,7 @@ def main():
         print("\nExiting...")
     except Exception as e:
         print(f"Error: {e}")
+    return 0
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())